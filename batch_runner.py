@@ -0,0 +1,284 @@
+# batch_runner.py
+"""
+Plays many headless games in parallel and aggregates the outcomes.
+
+Games run across a process pool; each game gets its own seed (game i uses base_seed + i),
+so any single game can be replayed. Games are spread round-robin over one or more
+Ollama endpoints. Every finished game is written to a JSONL file straight away (a new
+batch replaces the file unless --append is given), and the summary (win rates, game
+length, per-role survival, 95% confidence intervals) can be rebuilt from that file at
+any time:
+
+    python batch_runner.py --games 500 --players 7 --workers 8 \\
+        --endpoints http://gpu1:11434,http://gpu2:11434 --output runs.jsonl
+    python batch_runner.py --summarize runs.jsonl
+
+With --pool, every game instead sends each request through an EndpointPool over all
+endpoints (least-outstanding routing, --deadline per call, optional --hedge).
+
+When comparing models (--models a,b), add --affinity: games then run as threads in one
+process, and their requests go through a ModelAffinityScheduler per endpoint, so Ollama
+is not made to swap weights back and forth between interleaved games.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from concurrency import DEFAULT_MAX_CONCURRENCY
+
+Z_95 = 1.959964
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    """95% Wilson score interval for a proportion; (0, 0) with no trials."""
+    if trials == 0:
+        return (0.0, 0.0)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return (max(0.0, centre - margin), min(1.0, centre + margin))
+
+
+class OutcomeStats:
+    """Running aggregate of game results; memory stays constant however many games are added."""
+    def __init__(self):
+        self.games = 0
+        self.errors = 0
+        self.wins = defaultdict(int) # winner -> games ("none" = hit the day limit)
+        self.days_sum = 0.0
+        self.days_sq_sum = 0.0
+        self.role_players = defaultdict(int)
+        self.role_survivors = defaultdict(int)
+
+    def add(self, result):
+        if result.get("error"):
+            self.errors += 1
+            return
+        self.games += 1
+        self.wins[result["winner"] or "none"] += 1
+        self.days_sum += result["days"]
+        self.days_sq_sum += result["days"] ** 2
+        for role, count in result["role_counts"].items():
+            self.role_players[role] += count
+            self.role_survivors[role] += result["survivors_by_role"].get(role, 0)
+
+    def summary(self):
+        n = self.games
+        mean_days = self.days_sum / n if n else 0.0
+        variance = (self.days_sq_sum - n * mean_days ** 2) / (n - 1) if n > 1 else 0.0
+        margin = Z_95 * math.sqrt(max(variance, 0.0) / n) if n else 0.0
+        return {
+            "games": n,
+            "errors": self.errors,
+            "win_rates": {
+                winner: {"rate": count / n, "ci95": wilson_interval(count, n)}
+                for winner, count in sorted(self.wins.items())
+            },
+            "days": {"mean": mean_days, "stdev": math.sqrt(max(variance, 0.0)),
+                     "ci95": (mean_days - margin, mean_days + margin)},
+            "survival_by_role": {
+                role: {"rate": self.role_survivors[role] / total,
+                       "ci95": wilson_interval(self.role_survivors[role], total)}
+                for role, total in sorted(self.role_players.items())
+            },
+        }
+
+
+_POOLS = {} # One endpoint pool per worker process, reused by the games it plays
+
+
+def make_pool(kind, endpoints, deadline, hedge):
+    key = (kind, tuple(endpoints), deadline, hedge)
+    if key not in _POOLS:
+        from endpoint_pool import EndpointPool
+        _POOLS[key] = EndpointPool(endpoints, client=kind, deadline=deadline, hedge=hedge)
+        _POOLS[key].start_health_checks() # Brings endpoints that went down back into routing
+    return _POOLS[key]
+
+
+def make_backend(kind, endpoint, seed, latency, pool=None):
+    if pool:
+        return make_pool(kind, pool["endpoints"], pool["deadline"], pool["hedge"])
+    if kind == "ollama":
+        from llm_backends import OllamaBackend
+        return OllamaBackend(host=endpoint)
+    if kind == "http":
+        from llm_backends import HTTPBackend
+        return HTTPBackend(endpoint)
+    from llm_backends import ScriptedBackend
+    return ScriptedBackend(seed=seed, latency=latency)
+
+
+def play_game(job, backend=None):
+    """
+    Runs one game (in a worker process, or a thread with a shared backend).
+    Never raises: failures come back as error results.
+    """
+    from game import Game # Imported in the worker, after the fork/spawn
+    from llm_interface import parse_latency_budgets
+    started = time.perf_counter()
+    try:
+        if backend is None:
+            backend = make_backend(job["backend"], job["endpoint"], job["seed"], job["latency"], job["pool"])
+        event_log = None
+        if job["events_dir"]: # One file per game, so parallel workers never share a writer
+            event_log = os.path.join(job["events_dir"], f"game-{job['game_id']:06d}.jsonl")
+        game = Game(num_players=job["num_players"], llm_model=job["model"], seed=job["seed"],
+                    backend=backend, max_concurrency=job["concurrency"], verbose=False, pace=False,
+                    choice_model=job["choice_model"], statement_model=job["statement_model"],
+                    event_log=event_log, game_id=job["game_id"], discussion_rounds=job["discussion_rounds"],
+                    latency_budgets=parse_latency_budgets(job["budgets"]))
+        game.run_game()
+        result = game.get_result()
+        result["llm_calls"] = len(game.metrics.calls())
+        result["time_to_first_action_s"] = game.llm_interface.time_to_first_action
+        result["deadline_fallbacks"] = sum(game.llm_interface.deadline_stats.values())
+    except Exception as e:
+        result = {"seed": job["seed"], "num_players": job["num_players"], "error": f"{type(e).__name__}: {e}"}
+    result.update(game_id=job["game_id"], endpoint=job["endpoint"], model=job["model"],
+                  seconds=time.perf_counter() - started)
+    return result
+
+
+def build_jobs(args):
+    endpoints = split_list(args.endpoints) or [None]
+    models = split_list(args.models) or ["llama3"]
+    pool = None
+    if args.pool:
+        if args.backend == "scripted" or endpoints == [None]:
+            raise SystemExit("--pool needs --endpoints and the ollama or http backend.")
+        pool = {"endpoints": endpoints, "deadline": args.deadline, "hedge": args.hedge}
+    return [
+        {
+            "game_id": i, "seed": args.seed + i, "num_players": args.players, "model": models[i % len(models)],
+            "choice_model": args.choice_model, "statement_model": args.statement_model,
+            "backend": args.backend, "endpoint": endpoints[i % len(endpoints)], "latency": args.latency,
+            "concurrency": args.concurrency, "pool": pool, "events_dir": args.events,
+            "discussion_rounds": args.discussion_rounds, "budgets": args.budgets,
+        }
+        for i in range(args.games)
+    ]
+
+
+def split_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def submit_games(pool, jobs, args):
+    """Process pool: one game per task. Affinity mode: threads sharing one scheduled backend per endpoint."""
+    if not args.affinity:
+        return [pool.submit(play_game, job) for job in jobs], []
+
+    from model_scheduler import ModelAffinityScheduler, ScheduledBackend
+    schedulers = []
+    backends = {}
+    for job in jobs:
+        if job["endpoint"] not in backends:
+            scheduler = ModelAffinityScheduler(max_in_flight=args.max_in_flight)
+            schedulers.append(scheduler)
+            inner = make_backend(job["backend"], job["endpoint"], args.seed, job["latency"], job["pool"])
+            backends[job["endpoint"]] = ScheduledBackend(inner, scheduler)
+    return [pool.submit(play_game, job, backends[job["endpoint"]]) for job in jobs], schedulers
+
+
+def run_batch(args):
+    stats = OutcomeStats()
+    jobs = build_jobs(args)
+    if args.events:
+        os.makedirs(args.events, exist_ok=True)
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor if args.affinity else ProcessPoolExecutor
+    mode = "a" if args.append else "w" # A rerun must not count its games twice in --summarize
+    with open(args.output, mode, encoding="utf-8") as out, executor(max_workers=args.workers) as pool:
+        futures, schedulers = submit_games(pool, jobs, args)
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            out.write(json.dumps(result) + "\n")
+            out.flush() # A crash mid-batch keeps every finished game
+            stats.add(result)
+            if done % max(1, len(jobs) // 20) == 0 or done == len(jobs):
+                rate = done / (time.perf_counter() - started) * 3600
+                print(f"{done}/{len(jobs)} games done ({rate:.0f} games/hour)", file=sys.stderr)
+    for scheduler in schedulers:
+        print(f"Model scheduler: {scheduler.stats()}", file=sys.stderr)
+        scheduler.shutdown()
+    return stats
+
+
+def summarize_file(path):
+    stats = OutcomeStats()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                stats.add(json.loads(line))
+    return stats
+
+
+def print_summary(summary):
+    print(f"Games: {summary['games']} (errors: {summary['errors']})")
+    print("Win rates:")
+    for winner, entry in summary["win_rates"].items():
+        low, high = entry["ci95"]
+        print(f"  {winner:<12} {entry['rate']:6.1%}  (95% CI {low:.1%} - {high:.1%})")
+    days = summary["days"]
+    print(f"Game length: {days['mean']:.2f} days (stdev {days['stdev']:.2f}, "
+          f"95% CI {days['ci95'][0]:.2f} - {days['ci95'][1]:.2f})")
+    print("Survival by role:")
+    for role, entry in summary["survival_by_role"].items():
+        low, high = entry["ci95"]
+        print(f"  {role:<12} {entry['rate']:6.1%}  (95% CI {low:.1%} - {high:.1%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many headless Werewolf games in parallel.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", type=int, default=7)
+    parser.add_argument("--models", default="llama3", help="Comma-separated models; game i uses model i mod N.")
+    parser.add_argument("--choice-model", help="Model for votes and night choices (default: the game's model).")
+    parser.add_argument("--statement-model", help="Model for daytime statements (default: the game's model).")
+    parser.add_argument("--affinity", action="store_true",
+                        help="Run games as threads and batch their requests by model to avoid model swaps.")
+    parser.add_argument("--max-in-flight", type=int, default=4,
+                        help="Affinity mode: concurrent requests per endpoint for the resident model.")
+    parser.add_argument("--backend", choices=("ollama", "http", "scripted"), default="ollama")
+    parser.add_argument("--endpoints", help="Comma-separated Ollama hosts, shared round-robin by the games.")
+    parser.add_argument("--pool", action="store_true",
+                        help="Route every request through a least-loaded pool of all endpoints.")
+    parser.add_argument("--deadline", type=float, help="Pool mode: seconds before a request gives up.")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Pool mode: reissue requests slower than the recent p95 to a second endpoint.")
+    parser.add_argument("--latency", default="0", help="Latency spec for the scripted backend.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (threads with --affinity).")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Max simultaneous LLM calls inside each game.")
+    parser.add_argument("--discussion-rounds", type=int,
+                        help="Day discussion in this many parallel rounds (default: one speaker at a time).")
+    parser.add_argument("--budgets", help='LLM latency budgets: "default", seconds for every call type, '
+                                          'or e.g. "vote=10,statement=20". Over-budget calls use heuristics.')
+    parser.add_argument("--seed", type=int, default=0, help="Game i is played with seed + i.")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Per-game results are written here.")
+    parser.add_argument("--append", action="store_true",
+                        help="Add to --output instead of replacing it, e.g. to extend a batch with new seeds.")
+    parser.add_argument("--events", metavar="DIR",
+                        help="Write each game's event log here (read with event_log.py replay/stats).")
+    parser.add_argument("--summarize", metavar="JSONL", help="Only print the summary of an existing results file.")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args(argv)
+
+    stats = summarize_file(args.summarize) if args.summarize else run_batch(args)
+    summary = stats.summary()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+# benchmark.py
+"""
+Headless benchmark of the game engine against a fake LLM backend.
+
+Sweeps player counts and reports, per count: games per second, LLM calls per game,
+prompt bytes per call, p50/p95 night/day phase latency and peak memory.
+Results are saved as JSON and can be compared against an earlier run:
+
+    python benchmark.py --players 3,10,50,200 --games 5 --latency 0 --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+from concurrency import DEFAULT_MAX_CONCURRENCY
+from fake_ollama_server import FakeOllamaServer
+from game import Game
+from llm_backends import HTTPBackend, ScriptedBackend
+from metrics import MetricsRecorder
+
+DEFAULT_PLAYER_COUNTS = (3, 5, 10, 20, 50, 100, 200)
+# Metrics where a higher value is better; every other compared metric is "lower is better"
+HIGHER_IS_BETTER = {"games_per_sec"}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(fraction * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def make_backend(kind, seed, latency, server_url=None):
+    if kind == "http":
+        return HTTPBackend(server_url)
+    return ScriptedBackend(seed=seed, latency=latency)
+
+
+def play_one(num_players, seed, args, metrics, server_url=None):
+    game = Game(num_players=num_players, backend=make_backend(args.backend, seed, args.latency, server_url),
+                max_concurrency=args.concurrency, metrics=metrics, verbose=False, pace=False, seed=seed,
+                discussion_rounds=args.discussion_rounds)
+    game.run_game()
+    return game
+
+
+def bench_player_count(num_players, args, server_url=None):
+    metrics = MetricsRecorder()
+    started = time.perf_counter()
+    for i in range(args.games):
+        play_one(num_players, args.seed + i, args, metrics, server_url)
+    elapsed = time.perf_counter() - started
+
+    calls = metrics.calls()
+    result = {
+        "players": num_players,
+        "games": args.games,
+        "seconds": elapsed,
+        "games_per_sec": args.games / elapsed if elapsed else 0.0,
+        "llm_calls_per_game": len(calls) / args.games,
+        "prompt_bytes_per_call": sum(c["prompt_bytes"] for c in calls) / len(calls) if calls else 0.0,
+    }
+    for phase in ("night", "day"):
+        durations = [p["wall_time_s"] for p in metrics.phases() if p["phase"] == phase]
+        result[f"{phase}_p50_s"] = percentile(durations, 0.50)
+        result[f"{phase}_p95_s"] = percentile(durations, 0.95)
+
+    if args.memory:
+        # Separate traced game, so tracemalloc's overhead doesn't skew the timings above
+        tracemalloc.start()
+        play_one(num_players, args.seed, args, MetricsRecorder(), server_url)
+        result["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Prints relative changes against a baseline run; returns the list of regressions."""
+    regressions = []
+    by_players = {r["players"]: r for r in baseline["results"]}
+    print(f"\nComparison against baseline (regression threshold {threshold:.0%}):")
+    for result in results:
+        old = by_players.get(result["players"])
+        if old is None:
+            continue
+        for metric in ("games_per_sec", "llm_calls_per_game", "prompt_bytes_per_call",
+                       "night_p95_s", "day_p95_s", "peak_memory_mb"):
+            if metric not in result or not old.get(metric):
+                continue
+            change = (result[metric] - old[metric]) / old[metric]
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = " REGRESSION" if worse > threshold else ""
+            print(f"  players={result['players']:<5} {metric:<22} {old[metric]:>12.4f} -> {result[metric]:>12.4f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((result["players"], metric, change))
+    return regressions
+
+
+def print_table(results):
+    header = f"{'players':>7} {'games/s':>9} {'calls/game':>11} {'bytes/call':>11} {'night p50/p95 s':>17} {'day p50/p95 s':>17} {'peak MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        memory = f"{r['peak_memory_mb']:.1f}" if "peak_memory_mb" in r else "-"
+        print(f"{r['players']:>7} {r['games_per_sec']:>9.2f} {r['llm_calls_per_game']:>11.1f} "
+              f"{r['prompt_bytes_per_call']:>11.0f} "
+              f"{r['night_p50_s']:>8.4f}/{r['night_p95_s']:<8.4f} {r['day_p50_s']:>8.4f}/{r['day_p95_s']:<8.4f} "
+              f"{memory:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Werewolf game engine headlessly.")
+    parser.add_argument("--players", default=",".join(str(n) for n in DEFAULT_PLAYER_COUNTS),
+                        help="Comma-separated player counts to sweep.")
+    parser.add_argument("--games", type=int, default=5, help="Games per player count.")
+    parser.add_argument("--backend", choices=("scripted", "http"), default="scripted",
+                        help="In-process scripted backend, or HTTP against a local fake Ollama server.")
+    parser.add_argument("--latency", default="0", help='Fake LLM latency spec, e.g. "0.05" or "lognormal:0.5:0.4".')
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument("--discussion-rounds", type=int,
+                        help="Day discussion in this many parallel rounds (default: one speaker at a time).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip peak memory measurement.")
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change that counts as a regression.")
+    args = parser.parse_args(argv)
+
+    player_counts = [int(n) for n in args.players.split(",") if n.strip()]
+    server = None
+    if args.backend == "http":
+        server = FakeOllamaServer(latency=args.latency, seed=args.seed).start()
+
+    results = []
+    try:
+        for num_players in player_counts:
+            results.append(bench_player_count(num_players, args, server.url if server else None))
+            print(f"players={num_players}: {results[-1]['games_per_sec']:.2f} games/s", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print_table(results)
+    report = {
+        "meta": {
+            "timestamp": time.time(), "python": platform.python_version(), "backend": args.backend,
+            "latency": args.latency, "concurrency": args.concurrency, "games": args.games, "seed": args.seed,
+            "discussion_rounds": args.discussion_rounds,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+# checkpoint.py
+import json
+import os
+
+CHECKPOINT_VERSION = 2
+
+
+def rng_state_to_json(state):
+    """random.Random.getstate() as plain lists, so it fits in JSON."""
+    version, internal, gauss_next = state
+    return [version, list(internal), gauss_next]
+
+
+def rng_state_from_json(data):
+    version, internal, gauss_next = data
+    return (version, tuple(internal), gauss_next)
+
+
+def write_checkpoint(path, state):
+    """
+    Writes compact JSON next to `path`, then renames it into place, so a crash mid-write
+    leaves the previous checkpoint intact. Returns the number of bytes written.
+    No fsync: this guards against the game process dying, not the machine.
+    """
+    data = json.dumps({"version": CHECKPOINT_VERSION, **state}, separators=(",", ":")).encode("utf-8")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_checkpoint(path):
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {state.get('version')!r} in {path}.")
+    return state
@@ -0,0 +1,30 @@
+# concurrency.py
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+# The buffered log of the task running in this context (see night_scheduler.BufferedLog), if any.
+# Messages raised deep inside a concurrent task, like LLM fallback notices, go there so they
+# come out in the task's order instead of whenever the call happened to finish.
+current_log = contextvars.ContextVar("current_log", default=None)
+
+
+def run_ordered(tasks, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Runs a list of zero-argument callables concurrently on a bounded thread pool.
+    Results are returned in the same order as the tasks, regardless of which
+    one finished first, so callers can log them deterministically.
+    Exceptions raised by a task are re-raised here (first failing task in order).
+    Each task runs in a copy of the caller's context, so context variables
+    (e.g. metrics tags) carry over into the pool threads.
+    """
+    if not tasks:
+        return []
+    # One task (or concurrency disabled) gains nothing from a pool
+    if len(tasks) == 1 or max_concurrency <= 1:
+        return [task() for task in tasks]
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(tasks))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, task) for task in tasks]
+        return [future.result() for future in futures]
@@ -0,0 +1,302 @@
+# endpoint_pool.py
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from llm_backends import HTTPBackend, LLMBackend, OllamaBackend, WarmedModels
+
+
+class DeadlineExceeded(TimeoutError):
+    """No endpoint answered before the call's deadline."""
+    pass
+
+
+class NoHealthyEndpoints(ConnectionError):
+    pass
+
+
+def _is_connection_error(error):
+    """Errors that mean the server is unreachable, as opposed to slow or rejecting one request."""
+    if isinstance(error, TimeoutError):
+        return False
+    # httpx (used by the ollama client) doesn't subclass OSError for connect failures
+    return isinstance(error, (ConnectionError, OSError)) or type(error).__name__ == "ConnectError"
+
+
+def _p95(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class Endpoint:
+    """One Ollama server with a persistent client and its own load/latency bookkeeping."""
+    def __init__(self, host, backend):
+        self.host = host
+        self.backend = backend
+        self.outstanding = 0 # Requests currently running against this endpoint
+        self.healthy = True
+        self.last_error = None
+        self.requests = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=200) # Recent successful call durations, seconds
+
+    def recent_latency(self):
+        """Mean of the last few call durations; 0.0 before any call, so new endpoints get tried."""
+        recent = list(self.latencies)[-10:]
+        return sum(recent) / len(recent) if recent else 0.0
+
+    def stats(self):
+        return {"host": self.host, "healthy": self.healthy, "outstanding": self.outstanding,
+                "requests": self.requests, "failures": self.failures, "p95_s": _p95(self.latencies),
+                "last_error": self.last_error}
+
+
+class EndpointPool(LLMBackend):
+    """
+    Spreads chat calls over several Ollama endpoints.
+    - Routing: the healthy endpoint with the fewest outstanding requests; ties go to the one
+      with the lowest recent latency, then round-robin.
+    - Deadlines: a call that gets no answer within `deadline` seconds raises DeadlineExceeded.
+    - Hedging: if the first endpoint hasn't answered after the pool's recent p95 latency,
+      the same request also goes to a second endpoint, and whichever answers first wins.
+    - Failover: when an endpoint can't be reached it is marked unhealthy and the call moves
+      to another. Timeouts and errors of abandoned (hedged or past-deadline) requests don't
+      count against an endpoint's health.
+    - Health checks: check() probes every endpoint (replacing the one-off ollama.list()),
+      and start_health_checks() keeps doing so in the background so endpoints can recover.
+
+    client: "ollama" (ollama.Client per host), "http" (HTTPBackend), or a factory(host, timeout).
+    """
+    name = "pool"
+
+    def __init__(self, hosts, client="ollama", deadline=None, hedge=False, hedge_min_samples=20,
+                 hedge_delay=None, max_workers=32):
+        if not hosts:
+            raise ValueError("EndpointPool needs at least one host.")
+        factory = {"ollama": lambda host, timeout: OllamaBackend(host=host, timeout=timeout),
+                   "http": lambda host, timeout: HTTPBackend(host, timeout=timeout)}.get(client, client)
+        # Client-level timeout so abandoned (hedged or late) requests don't hold a thread forever
+        self.endpoints = [Endpoint(host, factory(host, deadline)) for host in hosts]
+        self.deadline = deadline
+        self.hedge = hedge and len(self.endpoints) > 1
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_delay = hedge_delay # Fixed delay; None = recent p95 once enough samples exist
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+
+        self._latencies = deque(maxlen=500) # Pool-wide, for the hedge delay
+        self._lock = threading.Lock()
+        self._tie_breaker = itertools.count()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="endpoint-pool")
+        self._health_thread = None
+        self._stop_health = threading.Event()
+        self._probed = False # Whether health_check() has run at least once
+        self._warmed = WarmedModels() # Games sharing the pool warm each model up once, not once each
+
+    # --- health ---
+
+    def health_check(self):
+        """Probes every endpoint; returns {host: healthy}."""
+        for endpoint in self.endpoints:
+            try:
+                endpoint.backend.check()
+                endpoint.healthy = True
+                endpoint.last_error = None
+            except Exception as e:
+                endpoint.healthy = False
+                endpoint.last_error = f"{type(e).__name__}: {e}"
+        self._probed = True
+        return {endpoint.host: endpoint.healthy for endpoint in self.endpoints}
+
+    def check(self):
+        # Every game sharing the pool calls this; once background checks are running and have
+        # probed the endpoints, they keep the status current
+        if self._health_thread is None or not self._probed:
+            self.health_check()
+        if not any(e.healthy for e in self.endpoints):
+            details = "; ".join(f"{e.host}: {e.last_error}" for e in self.endpoints)
+            raise NoHealthyEndpoints(f"No Ollama endpoint is reachable ({details}).")
+
+    def warm_up(self, model, keep_alive=None):
+        """
+        Loads the model on every healthy endpoint at once; fails only if none could load it.
+        Only the first warm-up per model does this: the pool is shared by many games.
+        """
+        self._warmed.warm_up(model, lambda: self._load_everywhere(model, keep_alive))
+
+    def _load_everywhere(self, model, keep_alive):
+        endpoints = [e for e in self.endpoints if e.healthy]
+        futures = [self._pool.submit(e.backend.warm_up, model, keep_alive) for e in endpoints]
+        errors = []
+        for endpoint, future in zip(endpoints, futures):
+            try:
+                future.result()
+            except Exception as e:
+                endpoint.healthy = False
+                endpoint.last_error = f"{type(e).__name__}: {e}"
+                errors.append(e)
+        if endpoints and len(errors) == len(endpoints):
+            raise errors[0]
+
+    def start_health_checks(self, interval=10.0):
+        if self._health_thread is not None:
+            return
+        def loop():
+            while not self._stop_health.wait(interval):
+                self.health_check()
+        self._health_thread = threading.Thread(target=loop, name="endpoint-health", daemon=True)
+        self._health_thread.start()
+
+    def close(self):
+        self._stop_health.set()
+        self._pool.shutdown(wait=False)
+
+    # --- routing ---
+
+    def _acquire(self, exclude=()):
+        """Least-outstanding healthy endpoint, already counted as busy. None if nothing is left."""
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude and e.healthy]
+            if not candidates: # Everything looks down: try the rest anyway rather than fail outright
+                candidates = [e for e in self.endpoints if e not in exclude]
+            if not candidates:
+                return None
+            tie = next(self._tie_breaker)
+            # Equal load: prefer the endpoint that has been answering faster, then round-robin
+            endpoint = min(candidates, key=lambda e: (e.outstanding, e.recent_latency(),
+                                                      (self.endpoints.index(e) - tie) % len(self.endpoints)))
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _record_failure(self, endpoint, error, abandoned=False):
+        if abandoned:
+            return # Nobody is waiting for this request any more; its timeout says nothing new
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.last_error = f"{type(error).__name__}: {error}"
+            if _is_connection_error(error):
+                endpoint.healthy = False # Back in routing once a health check succeeds
+
+    def _run(self, endpoint, call, abandoned=None):
+        started = time.perf_counter()
+        try:
+            result = call(endpoint.backend)
+        except Exception as e:
+            self._record_failure(endpoint, e, abandoned is not None and abandoned.is_set())
+            raise
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            endpoint.latencies.append(elapsed)
+            self._latencies.append(elapsed)
+        return result
+
+    def current_hedge_delay(self):
+        if not self.hedge:
+            return None
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None # Not enough data yet to know what "slow" means
+            return _p95(self._latencies)
+
+    def chat(self, model, messages, options=None, stream=False, deadline=None, timeout=None, **kwargs):
+        deadline = self.deadline if deadline is None else deadline
+        if timeout is not None: # Bounds the whole call, and each request so none outlives it
+            deadline = timeout if deadline is None else min(deadline, timeout)
+            kwargs['timeout'] = timeout
+        call = lambda backend: backend.chat(model=model, messages=messages, options=options,
+                                            stream=stream, **kwargs)
+        if stream:
+            # Streams stay on one endpoint; the reader sees tokens as they come
+            endpoint = self._acquire()
+            if endpoint is None:
+                raise NoHealthyEndpoints("No Ollama endpoint is available.")
+            return self._stream(endpoint, call)
+        return self._call_with_hedging(call, deadline)
+
+    def _stream(self, endpoint, call):
+        try:
+            chunks = call(endpoint.backend)
+            try:
+                yield from chunks
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+        except Exception as e:
+            self._record_failure(endpoint, e)
+            raise
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+    def _call_with_hedging(self, call, deadline):
+        expires = time.perf_counter() + deadline if deadline is not None else None
+        tried = []
+        running = {}
+        last_error = None
+        hedge_at = None
+        abandoned = threading.Event() # Set once this call has returned or given up
+
+        def launch():
+            endpoint = self._acquire(exclude=tried)
+            if endpoint is None:
+                return False
+            tried.append(endpoint)
+            running[self._pool.submit(self._run, endpoint, call, abandoned)] = endpoint
+            return True
+
+        if not launch():
+            raise NoHealthyEndpoints("No Ollama endpoint is available.")
+        hedge_delay = self.current_hedge_delay()
+        if hedge_delay is not None:
+            hedge_at = time.perf_counter() + hedge_delay
+
+        try:
+            while running:
+                now = time.perf_counter()
+                timeouts = [t - now for t in (expires, hedge_at) if t is not None]
+                timeout = max(0.0, min(timeouts)) if timeouts else None
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    endpoint = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        last_error = e
+                        if not running: # Fail over to an endpoint we haven't tried yet
+                            launch()
+                        continue
+                    if len(tried) > 1:
+                        with self._lock:
+                            self.hedge_wins += int(endpoint is not tried[0])
+                    return result # Any other request still running is abandoned; its result is ignored
+
+                now = time.perf_counter()
+                if expires is not None and now >= expires:
+                    raise DeadlineExceeded(f"No endpoint answered within {deadline:.1f}s.")
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    if launch():
+                        with self._lock:
+                            self.hedged_requests += 1
+        finally:
+            abandoned.set()
+
+        raise last_error if last_error is not None else NoHealthyEndpoints("No Ollama endpoint is available.")
+
+    def stats(self):
+        with self._lock:
+            return {"endpoints": [e.stats() for e in self.endpoints], "hedged_requests": self.hedged_requests,
+                    "hedge_wins": self.hedge_wins, "hedge_delay_s": None if not self.hedge else (
+                        self.hedge_delay if self.hedge_delay is not None else _p95(self._latencies))}
@@ -0,0 +1,238 @@
+# event_log.py
+"""
+Typed, streaming game event log.
+
+Game writes one JSON object per line as events happen (through a buffered file) and
+only keeps the most recent events in memory. The same module reads logs back one line
+at a time, so any number of games can be replayed or summarized in constant memory:
+
+    python event_log.py replay games.jsonl --game 3
+    python event_log.py stats games.jsonl more_games.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import Counter, defaultdict, deque
+
+# Every event has: seq, game, type, day. Extra fields per type:
+EVENT_FIELDS = {
+    "game_start": ("seed", "players"), # players: [{"name", "role"}] in seating order
+    "night_kill": ("target", "choices"), # target None = nobody died; choices: {wolf: victim}
+    "investigation": ("seer", "target", "is_werewolf"),
+    "statement": ("speaker", "text"),
+    "vote": ("voter", "target", "valid"), # target None = abstained or failed to vote
+    "lynch": ("target", "role", "tally", "tie"), # target None = no votes or a tie
+    "game_over": ("winner", "survivors"), # winner None = hit the day limit
+    "fallback": ("call_type", "player", "budget_s", "choice"), # An LLM call ran over budget
+}
+
+
+class EventLog:
+    """
+    Writes game events to a JSONL file through a buffered writer and keeps the last
+    `history` events in a ring buffer. Without a path, only the ring buffer is kept.
+    A new log replaces any existing file. Resuming from a checkpoint passes the saved
+    `offset` (events written after it are dropped, since the game replays that phase)
+    and `seq`, and appends from there.
+    """
+    def __init__(self, path=None, game_id=None, history=256, buffer_size=64 * 1024, offset=None, seq=0):
+        self.path = path
+        self.game_id = game_id
+        self.recent = deque(maxlen=history)
+        self.seq = seq
+        self._lock = threading.Lock() # Fallback events can come from concurrent calls
+        if path and offset is not None and os.path.exists(path):
+            os.truncate(path, offset)
+        mode = "a" if offset is not None else "w" # A rerun must not add its games to the old ones
+        self._file = open(path, mode, encoding="utf-8", buffering=buffer_size) if path else None
+
+    def emit(self, event_type, day, **fields):
+        if event_type not in EVENT_FIELDS:
+            raise ValueError(f"Unknown event type: {event_type}")
+        with self._lock:
+            event = {"seq": self.seq, "game": self.game_id, "type": event_type, "day": day, **fields}
+            self.seq += 1
+            self.recent.append(event)
+            if self._file is not None:
+                self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+        return event
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def tell(self):
+        """Flushes and returns the file offset after the last event (None without a file)."""
+        if self._file is None:
+            return None
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_events(paths, game=None):
+    """Streams events from one or more JSONL files, optionally only one game's."""
+    for path in [paths] if isinstance(paths, str) else paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if game is None or event.get("game") == game:
+                    yield event
+
+
+class GameReplay:
+    """Rebuilds a game's state (roles, who is alive, day, winner) by applying its events in order."""
+    def __init__(self):
+        self.roles = {} # name -> role
+        self.alive = {} # name -> role, in seating order
+        self.day = 0
+        self.winner = None
+        self.finished = False
+        self.seer_findings = {} # target -> is_werewolf
+
+    def apply(self, event):
+        kind = event["type"]
+        self.day = max(self.day, event.get("day") or 0)
+        if kind == "game_start":
+            self.roles = {p["name"]: p["role"] for p in event["players"]}
+            self.alive = dict(self.roles)
+        elif kind in ("night_kill", "lynch") and event["target"]:
+            self.alive.pop(event["target"], None)
+        elif kind == "investigation" and event["target"]:
+            self.seer_findings[event["target"]] = event["is_werewolf"]
+        elif kind == "game_over":
+            self.winner = event["winner"]
+            self.finished = True
+
+
+def describe(event):
+    """One human-readable line per event, for replays."""
+    kind = event["type"]
+    if kind == "game_start":
+        return f"Game {event['game']} (seed {event['seed']}): " + ", ".join(
+            f"{p['name']} ({p['role']})" for p in event["players"])
+    if kind == "night_kill":
+        if event["target"] is None:
+            return f"Night {event['day']}: nobody was killed."
+        return f"Night {event['day']}: {event['target']} was killed by the werewolves."
+    if kind == "investigation":
+        verdict = "a Werewolf" if event["is_werewolf"] else "NOT a Werewolf"
+        return f"Night {event['day']}: {event['seer']} (Seer) saw that {event['target']} is {verdict}."
+    if kind == "statement":
+        return f"Day {event['day']}: {event['speaker']} says: \"{event['text']}\""
+    if kind == "vote":
+        if event["target"] is None:
+            return f"Day {event['day']}: {event['voter']} abstained."
+        suffix = "" if event["valid"] else " (invalid, ignored)"
+        return f"Day {event['day']}: {event['voter']} votes for {event['target']}{suffix}."
+    if kind == "lynch":
+        if event["target"] is None:
+            return f"Day {event['day']}: " + ("tie vote, nobody is lynched." if event["tie"] else "no votes, nobody is lynched.")
+        return f"Day {event['day']}: {event['target']} was lynched. They were a {event['role']}."
+    if kind == "fallback":
+        return f"Day {event['day']}: {event['player']}'s {event['call_type']} ran over its {event['budget_s']:g}s budget; a heuristic chose {event['choice']!r}."
+    if kind == "game_over":
+        return f"Game over after {event['day']} day(s): " + (f"{event['winner']} win!" if event["winner"] else "no winner.")
+    return json.dumps(event)
+
+
+class EventStats:
+    """
+    Aggregates events from any number of games. Only games still in progress keep state,
+    so memory depends on how many games are interleaved, not on how many were logged.
+    """
+    def __init__(self):
+        self.events = Counter() # type -> count
+        self.games = 0
+        self.wins = Counter()
+        self.days_total = 0
+        self.lynches = Counter() # role lynched -> count ("none" = no lynch)
+        self.night_kills = Counter() # role killed -> count ("none" = nobody died)
+        self.seer_checks = 0
+        self.seer_hits = 0 # Investigations that found a werewolf
+        self.votes_on_wolves = 0
+        self.valid_votes = 0
+        self.statement_chars = 0
+        self._games = defaultdict(GameReplay) # Games seen but not yet over
+
+    def add(self, event):
+        self.events[event["type"]] += 1
+        replay = self._games[event.get("game")]
+        kind = event["type"]
+        if kind == "night_kill":
+            self.night_kills[replay.roles.get(event["target"], "none")] += 1
+        elif kind == "lynch":
+            self.lynches[event["role"] or "none"] += 1
+        elif kind == "investigation" and event["target"]:
+            self.seer_checks += 1
+            self.seer_hits += bool(event["is_werewolf"])
+        elif kind == "vote" and event["valid"]:
+            self.valid_votes += 1
+            self.votes_on_wolves += replay.roles.get(event["target"]) == "Werewolf"
+        elif kind == "statement":
+            self.statement_chars += len(event["text"])
+        replay.apply(event)
+        if replay.finished:
+            self.games += 1
+            self.wins[replay.winner or "none"] += 1
+            self.days_total += replay.day
+            del self._games[event.get("game")]
+
+    def summary(self):
+        return {
+            "games": self.games,
+            "unfinished_games": len(self._games),
+            "events": dict(self.events),
+            "win_rates": {w: n / self.games for w, n in sorted(self.wins.items())} if self.games else {},
+            "mean_days": self.days_total / self.games if self.games else 0.0,
+            "lynched_roles": dict(self.lynches),
+            "night_kill_roles": dict(self.night_kills),
+            "seer_hit_rate": self.seer_hits / self.seer_checks if self.seer_checks else 0.0,
+            "votes_on_werewolves": self.votes_on_wolves / self.valid_votes if self.valid_votes else 0.0,
+            "mean_statement_chars": self.statement_chars / self.events["statement"] if self.events["statement"] else 0.0,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay or summarize Werewolf event logs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    replay = sub.add_parser("replay", help="Print a game's events as a narrative.")
+    replay.add_argument("paths", nargs="+")
+    replay.add_argument("--game", type=json.loads, help="Only this game id (as logged, e.g. 3).")
+    stats = sub.add_parser("stats", help="Aggregate statistics over every game in the logs.")
+    stats.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        state = GameReplay()
+        for event in iter_events(args.paths, args.game):
+            if event["type"] == "game_start":
+                state = GameReplay()
+            state.apply(event)
+            print(describe(event))
+            if event["type"] in ("night_kill", "lynch"):
+                print(f"    alive: {', '.join(state.alive)}")
+    else:
+        aggregate = EventStats()
+        for event in iter_events(args.paths):
+            aggregate.add(event)
+        print(json.dumps(aggregate.summary(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
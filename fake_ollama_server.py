@@ -0,0 +1,150 @@
+# fake_ollama_server.py
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backends import LatencyModel, build_response, random_responder, split_stream_pieces
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real server
+    disable_nagle_algorithm = True # Small JSON replies must not wait on delayed ACKs
+
+    def log_message(self, format, *args):
+        pass # Silence per-request access logs
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True # Client gave up (deadline, or lost a hedged race)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            models = [{"name": name} for name in self.server.fake.models]
+            self._send_json({"models": models})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+        if self.path != "/api/chat":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        response = self.server.fake.handle_chat(request)
+        if request.get("stream", True): # Ollama streams unless told otherwise
+            self._send_stream(response)
+        else:
+            self._send_json(response)
+
+    def _send_stream(self, response):
+        """NDJSON chunks over chunked transfer encoding, one per word, then the final stats chunk."""
+        message = response["message"]
+        chunks = [
+            {"model": response["model"], "message": {"role": message["role"], "content": piece}, "done": False}
+            for piece in split_stream_pieces(message["content"])
+        ]
+        chunks.append(dict(response, message={"role": message["role"], "content": ""}))
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in chunks:
+                data = (json.dumps(chunk) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True # Client stopped reading early, or gave up before the reply
+
+
+class FakeOllamaServer:
+    """
+    Local stand-in for the Ollama chat API, for offline load tests.
+    Answers /api/chat with the given responder (default: random_responder(seed))
+    after a delay drawn from `latency` (any LatencyModel spec).
+
+        with FakeOllamaServer(latency="lognormal:0.8:0.4") as server:
+            backend = HTTPBackend(server.url)   # or OllamaBackend(host=server.url)
+    """
+    def __init__(self, host="127.0.0.1", port=0, responder=None, latency=0.0, seed=None,
+                 models=("llama3",)):
+        self.responder = responder or random_responder(seed)
+        self.latency = LatencyModel(latency, seed=seed)
+        self.models = list(models)
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _OllamaHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_chat(self, request):
+        started = time.perf_counter()
+        self.latency.sleep()
+        model = request.get("model", "")
+        messages = request.get("messages", [])
+        content = self.responder(model, messages, request.get("options"), request.get("format"))
+        with self._lock:
+            self.requests_served += 1
+        prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        return build_response(model, content, prompt_chars, time.perf_counter() - started)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Blocks serving requests in the current thread (used by the CLI)."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Ollama chat server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", default="0", help='e.g. "0.5", "uniform:0.2:1.0", "lognormal:0.8:0.4"')
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(host=args.host, port=args.port, latency=args.latency, seed=args.seed)
+    print(f"Fake Ollama server listening on {server.url} (latency: {args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,61 +1,160 @@
 # game.py
 import random
+import sys
 import time
-from collections import Counter
+from collections import Counter, deque
 
+from checkpoint import read_checkpoint, rng_state_from_json, rng_state_to_json, write_checkpoint
+from concurrency import current_log, run_ordered, DEFAULT_MAX_CONCURRENCY
+from event_log import EventLog
 from llm_interface import LLMInterface
+from night_scheduler import BufferedLog, NightActionScheduler, choose_pack_target
 from player_base import Player
 from villager import Villager
 from werewolf_player import Werewolf # Ensure this matches the filename werewolf_player.py
 from seer import Seer
 
+PLAYERS_PER_WEREWOLF = 6 # 3-11 players: 1 wolf, 12-17: 2 wolves, ...
+PLAYERS_PER_SEER = 25 # 3-49 players: 1 seer, 50-74: 2 seers, ...
+ROLE_CLASSES = {"Werewolf": Werewolf, "Seer": Seer, "Villager": Villager}
+
+
+def role_distribution(num_players):
+    """(werewolves, seers, villagers) for a game of num_players; scales linearly with size."""
+    num_werewolves = max(1, num_players // PLAYERS_PER_WEREWOLF)
+    num_seers = max(1, num_players // PLAYERS_PER_SEER)
+    num_villagers = num_players - num_werewolves - num_seers
+    if num_villagers < 1:
+        raise ValueError(f"Not enough players ({num_players}) for {num_werewolves} werewolf(s) and {num_seers} seer(s).")
+    return num_werewolves, num_seers, num_villagers
+
+
+def split_rounds(speakers, rounds):
+    """Splits the speaking order into `rounds` consecutive groups, as even as possible (None = one each)."""
+    rounds = len(speakers) if rounds is None else max(1, min(rounds, len(speakers)))
+    size, extra = divmod(len(speakers), rounds)
+    groups, start = [], 0
+    for i in range(rounds):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(speakers[start:end])
+        start = end
+    return groups
+
 
 class Game:
-    def __init__(self, num_players=5, llm_model="llama3"):
+    def __init__(self, num_players=5, llm_model="llama3", max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 cache=None, backend=None, chat_sessions=False, keep_alive=None,
+                 prompt_token_budget=None, discussion_window=None, stream_statements=False,
+                 metrics=None, verbose=True, pace=True, seed=None, choice_model=None, statement_model=None,
+                 event_log=None, game_id=None, log_history=200, checkpoint=None, discussion_rounds=None,
+                 latency_budgets=None, restore_state=None):
         if num_players < 3:
             raise ValueError("Game requires at least 3 players.")
         
-        self.llm_interface = LLMInterface(model_name=llm_model)
+        # Per-game RNG: the same seed replays the same roles, speaking order and fallbacks
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.llm_interface = LLMInterface(model_name=llm_model, cache=cache, backend=backend,
+                                          keep_alive=keep_alive, stream_statements=stream_statements,
+                                          metrics=metrics, verbose=verbose,
+                                          rng=random.Random(self.rng.getrandbits(64)),
+                                          choice_model=choice_model, statement_model=statement_model,
+                                          latency_budgets=latency_budgets)
+        self.metrics = self.llm_interface.metrics # Shared by LLM calls and phase timers
         self.players = []
+        # Indexed state, kept up to date by _kill(), so lookups don't scan every player
+        self.players_by_name = {}
+        self._alive = {} # name -> player, in seating order
+        self._alive_role_counts = Counter()
         self.num_players = num_players
+        self.max_concurrency = max_concurrency # Max simultaneous LLM calls (1 = fully serial)
+        self.night_scheduler = NightActionScheduler(max_concurrency=max_concurrency)
         self.day_number = 0
-        self.game_log = [] # To store major game events
+        self.winner = None # "Villagers" or "Werewolves" once the game is decided
+        self.next_phase = "night" # Where run_game continues; saved in checkpoints
+        self.checkpoint_path = checkpoint # Rewritten after every night and day phase when set
+        self.checkpoint_bytes = 0 # Size of the latest checkpoint
+        self._resumed = False
+        self.game_log = deque(maxlen=log_history) # Most recent log lines only; the full record is the event log
+        # Typed events (kills, votes, ...): a JSONL path, an EventLog, or None to keep only the last few in memory
+        self.game_id = game_id if game_id is not None else seed
+        self._owns_event_log = not isinstance(event_log, EventLog)
+        if self._owns_event_log:
+            event_log = EventLog(event_log, game_id=self.game_id, history=log_history)
+        self.events = event_log
+        self.verbose = verbose # False: headless, nothing is printed
+        # LLM calls over their latency budget are decided by a heuristic; log each one
+        self.llm_interface.on_fallback = self._on_llm_fallback
+        self.pace = pace # False: skip the dramatic time.sleep pauses (benchmarks, batch runs)
+        # Per-player incremental chat sessions: each call only sends what is new, so the
+        # model can reuse the cached prompt prefix (pair with keep_alive, e.g. "30m")
+        self.chat_sessions = chat_sessions
+        # Bounds on one-shot prompt size: older statements get folded into a rolling summary
+        self.prompt_token_budget = prompt_token_budget
+        self.discussion_window = discussion_window
+        # Day discussion in K rounds: speakers within a round talk at once, each seeing only the
+        # earlier rounds. 1 = everyone in parallel; None (or >= players) = one by one, as before
+        if discussion_rounds is not None and discussion_rounds < 1:
+            raise ValueError("discussion_rounds must be at least 1.")
+        self.discussion_rounds = discussion_rounds
+
+        if restore_state is None:
+            self._setup_players()
+        else: # resume(): the players come from the checkpoint, no new roles are dealt
+            self._restore(restore_state)
+
+    def _log(self, message, echo=True):
+        if echo and self.verbose:
+            print(message)
+        self.game_log.append(message)
 
-        self._setup_players()
+    def _on_llm_fallback(self, call_type, player_name, budget_s, value):
+        def report():
+            self._log(f"({player_name}'s {call_type.replace('_', ' ')} took longer than {budget_s:g}s; "
+                      f"a quick heuristic decided instead: {value})")
+            self.events.emit("fallback", self.day_number, call_type=call_type, player=player_name,
+                             budget_s=budget_s, choice=value)
+        # Concurrent calls report in their task's log order, not in the order they finished
+        log = current_log.get()
+        if log is not None:
+            log.defer(report)
+        else:
+            report()
 
-    def _log(self, message):
-        print(message)
-        self.game_log.append(message)
+    def _log_partial(self, text):
+        """Prints streamed text as it arrives; the finished line is logged separately."""
+        if self.verbose:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def _pause(self, seconds):
+        if self.pace:
+            time.sleep(seconds)
 
     def _setup_players(self):
         player_names = [f"Player{i+1}" for i in range(self.num_players)]
-        random.shuffle(player_names)
-
-        # Define roles: 1 Werewolf, 1 Seer, rest Villagers
-        # This can be made more dynamic for larger games
-        num_werewolves = 1
-        num_seers = 1
-        num_villagers = self.num_players - num_werewolves - num_seers
-
-        if num_villagers < 0 : # e.g. 2 players, 1 wolf, 1 seer = 0 villagers. Min 3.
-            # Adjust roles if not enough players for standard setup
-            if self.num_players == 3: # 1 wolf, 1 seer, 1 villager
-                num_villagers = 1
-            else: # Should not happen with num_players >=3 check. But as fallback:
-                num_villagers = max(0, num_villagers) # Ensure non-negative
-                self._log("Warning: Role distribution might be unusual due to low player count.")
+        self.rng.shuffle(player_names)
 
+        # Roughly 1 Werewolf per 6 players and 1 Seer per 25, rest Villagers
+        num_werewolves, num_seers, num_villagers = role_distribution(self.num_players)
 
         roles = ([Werewolf] * num_werewolves +
                  [Seer] * num_seers +
                  [Villager] * num_villagers)
         
-        random.shuffle(roles) # Shuffle roles to assign randomly
+        self.rng.shuffle(roles) # Shuffle roles to assign randomly
 
         for i in range(self.num_players):
             player_name = player_names[i]
             player_role_class = roles[i]
-            self.players.append(player_role_class(player_name, self.llm_interface))
+            player = player_role_class(player_name, self.llm_interface)
+            player.set_prompt_budget(self.prompt_token_budget, self.discussion_window)
+            if self.chat_sessions:
+                player.start_chat_session()
+            self.players.append(player)
+            self.players_by_name[player.name] = player
+            self._alive[player.name] = player
+            self._alive_role_counts[player.role] += 1
             # Do NOT reveal roles here, only to the player themselves (which is handled by their init)
 
         self._log("--- Game Setup ---")
@@ -74,30 +173,49 @@ class Game:
             self._log(f"- {player.name}: {status}") # Does not reveal role
 
 
+    def get_player(self, name):
+        return self.players_by_name.get(name)
+
+    def _kill(self, player):
+        """The only place a player dies, so the alive index and role counters stay in sync."""
+        if player.is_alive:
+            player.is_alive = False
+            del self._alive[player.name]
+            self._alive_role_counts[player.role] -= 1
+
     def _get_alive_players(self):
-        return [p for p in self.players if p.is_alive]
+        return list(self._alive.values())
 
     def _get_alive_werewolves(self):
-        return [p for p in self.players if p.is_alive and p.role == "Werewolf"]
+        return [p for p in self._alive.values() if p.role == "Werewolf"]
 
     def _get_alive_villagers_and_seer(self): # Town-aligned
-        return [p for p in self.players if p.is_alive and p.role != "Werewolf"]
+        return [p for p in self._alive.values() if p.role != "Werewolf"]
+
+    def _count_alive_werewolves(self):
+        return self._alive_role_counts["Werewolf"]
+
+    def _count_alive_town(self):
+        return len(self._alive) - self._alive_role_counts["Werewolf"]
 
     def _check_game_over(self):
-        alive_werewolves = self._get_alive_werewolves()
-        alive_villagers_team = self._get_alive_villagers_and_seer()
+        alive_werewolves = self._count_alive_werewolves()
+        alive_villagers_team = self._count_alive_town()
 
         if not alive_werewolves:
+            self.winner = "Villagers"
             self._log("\n--- GAME OVER ---")
             self._log("All Werewolves have been eliminated! Villagers Win!")
             return True
         
-        if len(alive_werewolves) >= len(alive_villagers_team):
+        if alive_werewolves >= alive_villagers_team:
+            self.winner = "Werewolves"
             self._log("\n--- GAME OVER ---")
             self._log("Werewolves now equal or outnumber Villagers! Werewolves Win!")
             return True
             
         if not alive_villagers_team: # Should be caught by above, but good check
+             self.winner = "Werewolves"
              self._log("\n--- GAME OVER ---")
              self._log("All Villagers have been eliminated! Werewolves Win!")
              return True
@@ -108,43 +226,61 @@ class Game:
         self.day_number += 1
         self._log(f"\n--- NIGHT {self.day_number} ---")
         self._log("Night falls. All players go to sleep...")
-        time.sleep(1) # For dramatic effect
 
-        # Store night actions results
-        werewolf_target = None
-        
-        # Werewolves act
-        # In a multi-wolf game, they'd need to coordinate or one acts for the pack
-        # For now, assuming one wolf or they 'magically' agree (first wolf's choice)
-        for player in self._get_alive_players():
-            if player.role == "Werewolf":
-                target = player.night_action(self._get_alive_players(), self._log)
-                if target: # Werewolf might not choose if no valid targets
-                    werewolf_target = target 
-                break # Only one werewolf pack action for now
-
-        # Seer acts (after werewolves, so they can't be saved by Seer finding them same night)
-        for player in self._get_alive_players():
-            if player.role == "Seer":
-                player.night_action(self._get_alive_players(), self._log)
-                break # Only one Seer action
-
-        time.sleep(1)
+        # Every role with a night action acts at once on the same snapshot of alive players.
+        # Nothing takes effect until dawn, so the calls are independent.
+        night_results = self.night_scheduler.run(self._get_alive_players(), self._log)
+
+        # Resolve night actions in fixed order (werewolves first, then seer, ...)
+        # Multiple wolves each pick a victim; the pack kills the most chosen one.
+        werewolf_choices = [(player, result) for player, result in night_results if player.role == "Werewolf"]
+        werewolf_target = choose_pack_target([result for player, result in werewolf_choices])
+        for player, target in night_results:
+            if player.role == "Seer" and target is not None:
+                self.events.emit("investigation", self.day_number, seer=player.name, target=target.name,
+                                 is_werewolf=target.role == "Werewolf")
+
         self._log("\n--- DAWN ---")
-        # Resolve night actions
+        killed = None
         if werewolf_target:
             if werewolf_target.is_alive: # Make sure target wasn't somehow protected/already dead
-                werewolf_target.is_alive = False
+                self._kill(werewolf_target)
+                killed = werewolf_target.name
                 self._log(f"A new day dawns. Sadly, {werewolf_target.name} was killed during the night.")
             else: # This case should be rare if targeting logic is correct
                  self._log(f"A new day dawns. The werewolves attacked {werewolf_target.name}, but they were already dead.")
 
         else:
             self._log("A new day dawns. Miraculously, everyone survived the night!")
+        self.events.emit("night_kill", self.day_number, target=killed,
+                         choices={wolf.name: target.name if target else None for wolf, target in werewolf_choices})
         
         self._print_player_status()
 
 
+    def _single_statement(self, player, alive_players_today, discussion_history):
+        self._log(f"\nIt's {player.name}'s turn to speak.")
+        self._pause(0.5) # Pause for LLM
+        if self.llm_interface.stream_statements:
+            self._log_partial(f"{player.name} says: \"")
+            notices = BufferedLog() # Holds the fallback notice if the statement runs over budget
+            speaking = [True] # A stream abandoned over budget may still deliver a last token
+            on_token = lambda text: self._log_partial(text) if speaking[0] else None
+            statement = notices.wrap(player.daytime_statement)(alive_players_today, discussion_history,
+                                                               on_token=on_token)
+            speaking[0] = False
+            self._log_partial("\"\n")
+            fell_back = bool(notices.messages)
+            notices.flush_to(self._log)
+            # Already shown, unless a heuristic replaced the partly streamed statement
+            self._log(f"{player.name} says: \"{statement}\"", echo=fell_back)
+        else:
+            statement = player.daytime_statement(alive_players_today, discussion_history)
+            self._log(f"{player.name} says: \"{statement}\"")
+        discussion_history.append((player.name, statement))
+        self.events.emit("statement", self.day_number, speaker=player.name, text=statement)
+        self._pause(1) # Pause after statement
+
     def _day_phase(self):
         self._log(f"\n--- DAY {self.day_number} ---")
         if self._check_game_over(): return
@@ -156,55 +292,74 @@ class Game:
         
         # Each alive player makes a statement
         # Shuffle order of speaking for fairness
-        speaker_order = random.sample(alive_players_today, len(alive_players_today))
-        for player in speaker_order:
-            if player.is_alive: # Double check, though list should only contain alive
+        speaker_order = self.rng.sample(alive_players_today, len(alive_players_today))
+        for speakers in split_rounds(speaker_order, self.discussion_rounds):
+            speakers = [p for p in speakers if p.is_alive] # Double check, though list should only contain alive
+            if len(speakers) == 1:
+                self._single_statement(speakers[0], alive_players_today, discussion_history)
+                continue
+
+            # The whole round speaks at once from the same snapshot; statements are then
+            # logged and appended in speaking order, so the result doesn't depend on timing.
+            # Streaming is off here: several statements can't be shown token by token at once.
+            snapshot = list(discussion_history)
+            buffers = [BufferedLog() for _ in speakers]
+            statement_tasks = [
+                buffer.wrap(lambda player=player: player.daytime_statement(alive_players_today, snapshot))
+                for player, buffer in zip(speakers, buffers)
+            ]
+            statements = run_ordered(statement_tasks, self.max_concurrency)
+            for player, statement, buffer in zip(speakers, statements, buffers):
                 self._log(f"\nIt's {player.name}'s turn to speak.")
-                time.sleep(0.5) # Pause for LLM
-                statement = player.daytime_statement(self.players, discussion_history)
+                buffer.flush_to(self._log)
                 self._log(f"{player.name} says: \"{statement}\"")
                 discussion_history.append((player.name, statement))
-                time.sleep(1) # Pause after statement
+                self.events.emit("statement", self.day_number, speaker=player.name, text=statement)
+                self._pause(1) # Pause after statement
 
         self._log("\n--- VOTING ---")
         self._log("After the discussion, it's time to vote for who to lynch.")
         
         votes = Counter()
         voters = self._get_alive_players()
-        for player in voters:
-            if player.is_alive:
-                self._log(f"\n{player.name}, who do you vote to lynch?")
-                time.sleep(0.5)
-                
-                # Players cannot vote for themselves (handled in Player.vote by filtering options)
-                # Ensure vote_options are only other alive players
-                vote_options_names = [p.name for p in self.players if p.is_alive and p.name != player.name]
-                
-                if not vote_options_names:
-                    self._log(f"{player.name} has no one to vote for (this shouldn't happen in a normal game).")
-                    continue
-
-                chosen_name = player.vote(self.players, discussion_history)
-                
-                if chosen_name:
-                    # Validate the LLM choice against current alive players who are not self
-                    valid_target = False
-                    for p_target in self.players:
-                        if p_target.name == chosen_name and p_target.is_alive and p_target.name != player.name:
-                            valid_target = True
-                            break
-                    
-                    if valid_target:
-                        self._log(f"{player.name} votes for {chosen_name}.")
-                        votes[chosen_name] += 1
-                    else:
-                        self._log(f"{player.name} tried to vote for {chosen_name}, which is not a valid target. Vote ignored.")
+
+        # Votes are independent: every voter sees the same frozen discussion_history,
+        # so all LLM calls are sent at once. Results come back in voter order,
+        # which keeps the log deterministic.
+        # Players cannot vote for themselves (handled in Player.vote by filtering options),
+        # so a voter has options as long as anyone else is alive
+        can_vote = len(voters) > 1
+        buffers = [BufferedLog() for _ in voters]
+        vote_tasks = [
+            buffer.wrap(lambda player=player: player.vote(voters, discussion_history)) if can_vote else (lambda: None)
+            for player, buffer in zip(voters, buffers)
+        ]
+        chosen_names = run_ordered(vote_tasks, self.max_concurrency)
+
+        for player, chosen_name, buffer in zip(voters, chosen_names, buffers):
+            self._log(f"\n{player.name}, who do you vote to lynch?")
+            buffer.flush_to(self._log)
+
+            if not can_vote:
+                self._log(f"{player.name} has no one to vote for (this shouldn't happen in a normal game).")
+                continue
+
+            valid_target = bool(chosen_name) and chosen_name in self._alive and chosen_name != player.name
+            self.events.emit("vote", self.day_number, voter=player.name, target=chosen_name or None, valid=valid_target)
+
+            if chosen_name:
+                # The LLM choice must be a current alive player who is not self (checked above)
+                if valid_target:
+                    self._log(f"{player.name} votes for {chosen_name}.")
+                    votes[chosen_name] += 1
                 else:
-                    self._log(f"{player.name} abstained or failed to vote.")
-                time.sleep(0.5)
+                    self._log(f"{player.name} tried to vote for {chosen_name}, which is not a valid target. Vote ignored.")
+            else:
+                self._log(f"{player.name} abstained or failed to vote.")
 
         if not votes:
             self._log("No votes were cast. No one is lynched today.")
+            self.events.emit("lynch", self.day_number, target=None, role=None, tally={}, tie=False)
             return
 
         self._log("\nVote Tally:")
@@ -223,12 +378,15 @@ class Game:
                 lynched_player_name = top_votes[0][0]
             else: # Tie for the highest vote
                 self._log("There's a tie for the most votes! No one is lynched today.")
+                self.events.emit("lynch", self.day_number, target=None, role=None, tally=dict(votes), tie=True)
 
 
         if lynched_player_name:
-            lynched_player = next((p for p in self.players if p.name == lynched_player_name), None)
+            lynched_player = self.get_player(lynched_player_name)
             if lynched_player and lynched_player.is_alive:
-                lynched_player.is_alive = False
+                self._kill(lynched_player)
+                self.events.emit("lynch", self.day_number, target=lynched_player.name, role=lynched_player.role,
+                                 tally=dict(votes), tie=False)
                 self._log(f"\nBy popular vote, {lynched_player.name} has been lynched!")
                 self._log(f"{lynched_player.name} was a {lynched_player.role}.") # Reveal role on lynch
             elif lynched_player and not lynched_player.is_alive:
@@ -239,25 +397,116 @@ class Game:
         self._print_player_status()
 
 
-    def run_game(self):
+    def _start_game(self):
         self._log("Let the game of Werewolf begin!")
+        self.events.emit("game_start", self.day_number, seed=self.seed,
+                         players=[{"name": p.name, "role": p.role} for p in self.players])
         
         # Initial role reveal to each player (handled by their knowledge)
+        werewolves = self._get_alive_werewolves()
         for player in self.players:
             player.add_known_info(f"You are a {player.role}.")
             if player.role == "Werewolf":
                  # Tell werewolves who other werewolves are (if any)
-                 other_wolves = [w.name for w in self._get_alive_werewolves() if w.name != player.name]
+                 other_wolves = [w.name for w in werewolves if w.name != player.name]
                  if other_wolves:
                      player.add_known_info(f"Your fellow werewolf(s): {', '.join(other_wolves)}.")
                  else:
                      player.add_known_info("You are the only werewolf.")
 
+    def get_result(self):
+        """Outcome of a finished game as a plain dict (winner, length, survivors per role)."""
+        roles = Counter(p.role for p in self.players)
+        return {
+            "seed": self.seed,
+            "num_players": self.num_players,
+            "winner": self.winner, # None if the game hit the day limit
+            "days": self.day_number,
+            "role_counts": dict(sorted(roles.items())),
+            "survivors_by_role": {role: self._alive_role_counts[role] for role in sorted(roles)},
+        }
+
+    def save_checkpoint(self):
+        """Snapshot taken between phases: everything run_game needs to carry on from next_phase."""
+        with self.metrics.phase("checkpoint", day=self.day_number, next_phase=self.next_phase):
+            state = {
+                "seed": self.seed,
+                "game_id": self.game_id,
+                "num_players": self.num_players,
+                "day_number": self.day_number,
+                "next_phase": self.next_phase,
+                "winner": self.winner,
+                # last_discussion: what a wolf's night-kill fallback goes by
+                "players": [[p.name, p.role, p.is_alive, p.known_information, p.last_discussion]
+                            for p in self.players],
+                "rng": rng_state_to_json(self.rng.getstate()),
+                # Flushing here also means a crash never loses events from finished phases
+                "event_log": {"path": self.events.path, "offset": self.events.tell(), "seq": self.events.seq},
+            }
+            self.checkpoint_bytes = write_checkpoint(self.checkpoint_path, state)
+
+    def _restore(self, state):
+        for name, role, is_alive, known_information, last_discussion in state["players"]:
+            player = ROLE_CLASSES[role](name, self.llm_interface)
+            player.set_prompt_budget(self.prompt_token_budget, self.discussion_window)
+            for info in known_information:
+                player.add_known_info(info)
+            player.last_discussion = [tuple(entry) for entry in last_discussion]
+            if self.chat_sessions:
+                player.start_chat_session() # The new session catches up from known_information
+            self.players.append(player)
+            self.players_by_name[name] = player
+            self._alive[name] = player
+            self._alive_role_counts[role] += 1
+            if not is_alive:
+                self._kill(player)
+        self.day_number = state["day_number"]
+        self.next_phase = state["next_phase"]
+        self.winner = state["winner"]
+        self.rng.setstate(rng_state_from_json(state["rng"]))
+        self._resumed = True
+
+    @classmethod
+    def resume(cls, path, **kwargs):
+        """
+        Rebuilds a game from its checkpoint; run_game() then continues with the next phase.
+        Pass the same model/backend options as the original game. The event log is reopened
+        at the checkpoint's offset unless `event_log` is given, and checkpoints keep going
+        to `path` unless `checkpoint` is given.
+        """
+        state = read_checkpoint(path)
+        saved_log = state["event_log"]
+        kwargs.setdefault("checkpoint", path)
+        kwargs.setdefault("game_id", state["game_id"])
+        owns_event_log = "event_log" not in kwargs
+        if owns_event_log:
+            kwargs["event_log"] = EventLog(saved_log["path"], game_id=kwargs["game_id"],
+                                           history=kwargs.get("log_history", 200),
+                                           offset=saved_log["offset"], seq=saved_log["seq"])
+        game = cls(num_players=state["num_players"], seed=state["seed"], restore_state=state, **kwargs)
+        game._owns_event_log = owns_event_log # Opened here on the game's behalf
+        return game
+
+    def _end_phase(self, next_phase):
+        self.next_phase = next_phase
+        if self.checkpoint_path:
+            self.save_checkpoint()
+
+    def run_game(self):
+        if self._resumed:
+            self._log(f"Resuming the game on day {self.day_number}, before the {self.next_phase} phase.")
+        else:
+            self._start_game()
 
         while not self._check_game_over():
-            self._night_phase()
-            if self._check_game_over(): break
-            self._day_phase()
+            if self.next_phase == "night":
+                with self.metrics.phase("night", day=self.day_number + 1):
+                    self._night_phase()
+                self._end_phase("day")
+                if self._check_game_over(): break
+            with self.metrics.phase("day", day=self.day_number):
+                self._day_phase()
+            self._end_phase("night")
             if self._check_game_over(): break
             
             # Safety break for very long games / testing
@@ -268,7 +517,11 @@ class Game:
         self._log("\n--- FINAL PLAYER ROLES ---")
         for player in self.players:
             self._log(f"{player.name} was a {player.role}.")
-        
-        self._log("\n--- GAME LOG ---")
-        for entry in self.game_log:
-            print(entry) # Print again for consolidated view if needed, or write to file
\ No newline at end of file
+
+        self.events.emit("game_over", self.day_number, winner=self.winner,
+                         survivors=[p.name for p in self._alive.values()])
+        # The full game is in the event log (event_log.py replays it), so it isn't printed twice
+        if self._owns_event_log:
+            self.events.close()
+        else:
+            self.events.flush()
\ No newline at end of file
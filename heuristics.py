@@ -0,0 +1,59 @@
+# heuristics.py
+"""
+Cheap in-process decisions, used when an LLM call runs over its latency budget
+(or keeps failing). They only look at what the player could see themselves.
+"""
+import re
+from collections import Counter
+
+# "PlayerX is a Werewolf." / "PlayerX is NOT a Werewolf." in a Seer's known_information
+VISION_PATTERN = re.compile(r"^(\S+) is (?:NOT )?a Werewolf\.$")
+
+
+def accusation_counts(discussion_history, names):
+    """How often each name is brought up by other players in today's discussion."""
+    patterns = {name: re.compile(r"\b" + re.escape(name) + r"\b", re.IGNORECASE) for name in names}
+    counts = Counter()
+    for speaker, statement in discussion_history or ():
+        for name, pattern in patterns.items():
+            if name != speaker and pattern.search(statement):
+                counts[name] += 1
+    return counts
+
+
+def most_accused(options, discussion_history, rng):
+    """The option mentioned by the most speakers; random among ties (or if nobody is accused)."""
+    counts = accusation_counts(discussion_history, options)
+    top = max((counts[name] for name in options), default=0)
+    if top == 0:
+        return rng.choice(options)
+    return rng.choice([name for name in options if counts[name] == top])
+
+
+def vote_target(options, discussion_history, rng):
+    """Votes with the crowd: the plurality of accusations in the discussion."""
+    return most_accused(options, discussion_history, rng)
+
+
+def werewolf_target(options, last_discussion, rng):
+    """Kills the non-wolf the village was most suspicious of yesterday (options exclude wolves)."""
+    return most_accused(options, last_discussion, rng)
+
+
+def seer_target(options, known_information, self_name, rng):
+    """Investigates someone the Seer has no vision of yet, preferring others over themselves."""
+    seen = {match.group(1) for match in map(VISION_PATTERN.match, known_information) if match}
+    fresh = [name for name in options if name not in seen and name != self_name]
+    return rng.choice(fresh or [name for name in options if name != self_name] or options)
+
+
+def statement(self_name, discussion_history, alive_names, rng):
+    """A short generic line, pointing at whoever is most accused so far."""
+    others = [name for name in alive_names if name != self_name]
+    if not others:
+        return "I have nothing to add."
+    counts = accusation_counts(discussion_history, others)
+    if counts:
+        suspect = counts.most_common(1)[0][0]
+        return f"I agree with the others that {suspect} deserves a closer look."
+    return f"I don't have much to go on yet, but {rng.choice(others)} has been quiet."
@@ -0,0 +1,332 @@
+# llm_backends.py
+import http.client
+import itertools
+import json
+import math
+import random
+import re
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Same wording LLMInterface.get_player_choice appends to choice prompts
+CHOICE_LIST_PATTERN = re.compile(r"Choose one name from this list: (.+?)\. Respond with only")
+
+CANNED_STATEMENTS = [
+    "I don't trust {name}, they have been too quiet.",
+    "I think {name} is acting suspiciously.",
+    "We should keep an eye on {name}.",
+    "I'm a simple villager, but {name} worries me.",
+    "Let's not rush this, though {name} seems off to me.",
+]
+
+
+class LatencyModel:
+    """
+    Samples an artificial response delay in seconds.
+    Spec can be a number (constant), a callable returning seconds, or a string:
+    "0.2", "uniform:LOW:HIGH", "normal:MEAN:STD", "lognormal:MEDIAN:SIGMA".
+    """
+    def __init__(self, spec=0.0, seed=None):
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sampler = self._build(spec)
+
+    def _build(self, spec):
+        if callable(spec):
+            return spec
+        if isinstance(spec, (int, float)):
+            return lambda: float(spec)
+
+        kind, *params = str(spec).split(":")
+        try:
+            if not params:
+                value = float(kind)
+                return lambda: value
+            params = [float(p) for p in params]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec '{spec}'.")
+        if kind == "uniform":
+            return lambda: self._rng.uniform(params[0], params[1])
+        if kind == "normal":
+            return lambda: self._rng.gauss(params[0], params[1])
+        if kind == "lognormal":
+            return lambda: self._rng.lognormvariate(math.log(params[0]), params[1])
+        raise ValueError(f"Unknown latency distribution '{kind}'.")
+
+    def sample(self):
+        with self._lock: # random.Random is shared by concurrent callers
+            return max(0.0, self._sampler())
+
+    def sleep(self):
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class LLMBackend:
+    """
+    Minimal protocol LLMInterface talks to. Responses follow the shape of Ollama's
+    chat API: {'message': {'role': 'assistant', 'content': ...}, 'eval_count': ..., ...}
+    chat() may be given timeout=seconds to bound that one request (e.g. by a latency budget).
+    """
+    name = "base"
+
+    def check(self):
+        """Raises if the backend cannot serve requests."""
+        pass
+
+    def chat(self, model, messages, options=None, **kwargs):
+        raise NotImplementedError
+
+    def warm_up(self, model, keep_alive=None):
+        """Loads `model` with a one-token generation, so the first real call doesn't pay for it."""
+        extra = {'keep_alive': keep_alive} if keep_alive is not None else {}
+        self.chat(model=model, messages=[{'role': 'user', 'content': 'Hi'}], options={'num_predict': 1}, **extra)
+
+
+class WarmedModels:
+    """
+    Models a shared backend has already loaded. Every game sharing the backend asks for a
+    warm-up; only the first request per model loads it, the others wait for that and return.
+    """
+    def __init__(self):
+        self._warm = set()
+        self._loading = {} # model -> lock held while it loads
+        self._lock = threading.Lock()
+
+    def warm_up(self, model, load):
+        with self._lock:
+            if model in self._warm:
+                return
+            loading = self._loading.setdefault(model, threading.Lock())
+        with loading:
+            with self._lock:
+                if model in self._warm:
+                    return
+            load() # A failure leaves the model cold, so the next game tries again
+            with self._lock:
+                self._warm.add(model)
+
+
+class OllamaBackend(LLMBackend):
+    """Talks to a real Ollama server (or anything speaking its HTTP API)."""
+    name = "ollama"
+
+    def __init__(self, host=None, timeout=None):
+        self.host = host
+        self.timeout = timeout
+        self._client = None
+        self._timed_clients = {} # Whole-second timeout -> client, for per-call timeouts
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Imported on first use, not at construction: building a Game stays fast, and the
+        # scripted/HTTP stand-ins work without the ollama package
+        with self._client_lock:
+            if self._client is None:
+                import ollama
+                # Default host goes through the module-level client, like before
+                if self.host or self.timeout is not None:
+                    self._client = ollama.Client(host=self.host, timeout=self.timeout)
+                else:
+                    self._client = ollama
+            return self._client
+
+    def _client_with_timeout(self, timeout):
+        # The ollama client only takes a timeout at construction. Rounding up to whole seconds
+        # keeps the number of clients (and their connection pools) small.
+        seconds = max(1, math.ceil(timeout))
+        with self._client_lock:
+            if seconds not in self._timed_clients:
+                import ollama
+                self._timed_clients[seconds] = ollama.Client(host=self.host, timeout=seconds)
+            return self._timed_clients[seconds]
+
+    def check(self):
+        self.client.list()
+
+    def chat(self, model, messages, options=None, timeout=None, **kwargs):
+        client = self.client if timeout is None else self._client_with_timeout(timeout)
+        return client.chat(model=model, messages=messages, options=options, **kwargs)
+
+
+class HTTPBackend(LLMBackend):
+    """
+    Dependency-free client for the Ollama HTTP API (/api/tags, /api/chat).
+    Keeps one persistent connection per thread. Useful against FakeOllamaServer
+    on machines without the ollama package.
+    """
+    name = "http"
+
+    def __init__(self, host="http://127.0.0.1:11434", timeout=None):
+        parts = urlsplit(host if "://" in host else f"http://{host}")
+        self.host = f"{parts.scheme}://{parts.netloc}"
+        self._netloc = parts.netloc
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self._netloc, timeout=self.timeout)
+            conn.connect()
+            # Headers and body go out in separate writes; don't let Nagle hold the body back
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method, path, payload=None, timeout=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        timeout = self.timeout if timeout is None else timeout
+        conn = self._connection()
+        conn.sock.settimeout(timeout) # The connection is reused, so set it for every request
+        try:
+            conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+        except TimeoutError:
+            # The server is slow, not gone: resending would only double its load
+            conn.close()
+            self._local.conn = None
+            raise
+        except (http.client.HTTPException, OSError):
+            # Stale keep-alive connection: reconnect once
+            conn.close()
+            self._local.conn = None
+            conn = self._connection()
+            conn.sock.settimeout(timeout)
+            conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+        if response.status != 200:
+            detail = response.read().decode("utf-8", "replace")
+            raise RuntimeError(f"{method} {self.host}{path} failed with HTTP {response.status}: {detail}")
+        return response
+
+    def check(self):
+        return json.loads(self._request("GET", "/api/tags").read())
+
+    def chat(self, model, messages, options=None, stream=False, timeout=None, **kwargs):
+        payload = {"model": model, "messages": messages, "stream": stream}
+        if options:
+            payload["options"] = options
+        payload.update(kwargs)
+        response = self._request("POST", "/api/chat", payload, timeout=timeout)
+        if stream:
+            return self._iter_stream(response)
+        return json.loads(response.read())
+
+    def _iter_stream(self, response):
+        """Yields NDJSON chunks. Closing early drops the connection so no stale data is left on it."""
+        done = False
+        try:
+            for line in response:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                done = chunk.get("done", False)
+                if done:
+                    # Read the chunked-encoding terminator too, so the keep-alive connection
+                    # is ready for the next request (otherwise it raises ResponseNotReady
+                    # and _request would send that request a second time)
+                    response.read()
+                yield chunk
+                if done:
+                    break
+        finally:
+            if not done:
+                self._local.conn.close()
+                self._local.conn = None
+
+
+def random_responder(seed=None):
+    """
+    Builds a responder that answers choice prompts with a random listed name and
+    anything else with a canned statement. The answer depends only on (seed, prompt),
+    so it stays deterministic when calls run concurrently and in any order.
+    A JSON-schema `format` with a name enum gets a {"name": ...} JSON answer.
+    """
+    def respond(model, messages, options=None, format=None):
+        prompt = messages[-1]['content']
+        rng = random.Random(f"{seed}:{model}:{prompt}")
+        enum = _schema_enum(format)
+        if enum:
+            return json.dumps({"name": rng.choice(enum)})
+        match = CHOICE_LIST_PATTERN.search(prompt)
+        if match:
+            return rng.choice(match.group(1).split(", "))
+        names = sorted(set(re.findall(r"\bPlayer\d+\b", prompt))) or ["someone"]
+        return rng.choice(CANNED_STATEMENTS).format(name=rng.choice(names))
+    return respond
+
+
+def _schema_enum(format):
+    """Allowed values of the first enum property in a JSON schema, if any."""
+    if not isinstance(format, dict):
+        return None
+    for prop in format.get("properties", {}).values():
+        if prop.get("enum"):
+            return prop["enum"]
+    return None
+
+
+def split_stream_pieces(content):
+    """Splits text into word-sized pieces (keeping the spaces), like a token stream."""
+    return re.findall(r"\S+\s*|\s+", content)
+
+
+def build_response(model, content, prompt_chars=0, elapsed=0.0):
+    """Ollama-shaped response dict with rough token counts (~4 chars per token)."""
+    return {
+        'model': model,
+        'message': {'role': 'assistant', 'content': content},
+        'done': True,
+        'prompt_eval_count': prompt_chars // 4,
+        'eval_count': max(1, len(content) // 4),
+        'eval_duration': int(elapsed * 1e9),
+        'total_duration': int(elapsed * 1e9),
+    }
+
+
+class ScriptedBackend(LLMBackend):
+    """
+    Deterministic in-process backend for tests and engine benchmarks.
+    - responses: list of strings returned in order (cycled), or
+    - responder: callable(model, messages, options, format) -> str (default: random_responder(seed)).
+    latency: optional LatencyModel spec; 0 means no delay at all.
+    """
+    name = "scripted"
+
+    def __init__(self, responses=None, responder=None, seed=None, latency=0.0):
+        self._responses = itertools.cycle(responses) if responses else None
+        self._responses_lock = threading.Lock()
+        self.responder = responder or random_responder(seed)
+        self.latency = LatencyModel(latency, seed=seed)
+        self.calls = 0
+
+    def warm_up(self, model, keep_alive=None):
+        pass # Nothing to load; also keeps scripted responses in order
+
+    def chat(self, model, messages, options=None, format=None, stream=False, **kwargs):
+        delay = self.latency.sleep() # In streaming mode this is the time to first token
+        with self._responses_lock:
+            self.calls += 1
+            if self._responses is not None:
+                content = next(self._responses)
+        if self._responses is None:
+            content = self.responder(model, messages, options, format)
+        prompt_chars = sum(len(m['content']) for m in messages)
+        final = build_response(model, content, prompt_chars, delay)
+        if stream:
+            return self._stream(model, content, final)
+        return final
+
+    @staticmethod
+    def _stream(model, content, final):
+        for piece in split_stream_pieces(content):
+            yield {'model': model, 'message': {'role': 'assistant', 'content': piece}, 'done': False}
+        final = dict(final, message={'role': 'assistant', 'content': ''})
+        yield final
@@ -0,0 +1,119 @@
+# llm_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class CacheMissError(KeyError):
+    """Raised in replay mode when a prompt was never recorded."""
+    pass
+
+
+class LLMCache:
+    """
+    Two-tier prompt/response cache keyed on (model, options, prompt, attempt).
+    - Memory tier: LRU dict bounded by max_entries.
+    - Disk tier: optional sqlite file, so recordings survive across runs.
+
+    Modes:
+    - "readwrite": serve hits, record misses (the normal record mode).
+    - "replay": serve only what is recorded; a miss raises CacheMissError.
+      Lets a recorded game be replayed with no Ollama server at all.
+    """
+    MODES = ("readwrite", "replay")
+
+    def __init__(self, path=None, max_entries=1024, mode="readwrite"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'. Expected one of: {', '.join(self.MODES)}.")
+        if mode == "replay" and path is None:
+            raise ValueError("Replay mode needs a path to a recorded cache file.")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.mode = mode
+        self.hits = 0 # Memory + disk hits
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock() # Calls may arrive from the concurrent vote/night pools
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, response TEXT)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model, messages, options=None, attempt=1):
+        """
+        Stable hash of everything that influences the model's answer. Retries of the same
+        prompt (attempt > 1) get their own keys, so a rejected answer isn't served again.
+        """
+        key = {"model": model, "options": options or {}, "messages": messages}
+        if attempt > 1: # First attempts keep the keys they had before retries were keyed
+            key["attempt"] = attempt
+        payload = json.dumps(key, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def is_replay(self):
+        return self.mode == "replay"
+
+    def get(self, key):
+        """Returns the cached response, or None on a miss (CacheMissError in replay mode)."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._remember(key, row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+        if self.is_replay:
+            raise CacheMissError(key)
+        return None
+
+    def put(self, key, response, model=None):
+        if self.is_replay: # Recordings are read-only while replaying
+            return
+        with self._lock:
+            self._remember(key, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response) VALUES (?, ?, ?)",
+                    (key, model, response),
+                )
+                self._db.commit()
+
+    def _remember(self, key, response):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,59 +1,481 @@
 # llm_interface.py
-import ollama
+import contextvars
+import json
+import random
 import re
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from llm_backends import OllamaBackend
+from llm_cache import CacheMissError
+from metrics import MetricsRecorder, add_response_stats, current_call, current_tags
+
+# Suggested per-call-type latency budgets in seconds (LLMInterface(latency_budgets=...))
+DEFAULT_LATENCY_BUDGETS = {"night_kill": 30.0, "seer_investigation": 30.0, "vote": 30.0, "statement": 45.0}
+WARMUP_KEEP_ALIVE = "5m" # How long the warm-up asks Ollama to keep the model loaded, unless keep_alive is set
+# End of a sentence: punctuation (plus closing quotes/brackets) followed by whitespace or end of text
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*(?=\s|$)')
+
+
+def parse_latency_budgets(spec):
+    """ "default", "20" (every call type) or "vote=10,statement=20" -> {call_type: seconds}."""
+    if not spec:
+        return None
+    if spec == "default":
+        return dict(DEFAULT_LATENCY_BUDGETS)
+    if "=" not in spec:
+        return {call_type: float(spec) for call_type in DEFAULT_LATENCY_BUDGETS}
+    budgets = {}
+    for part in spec.split(","):
+        call_type, seconds = part.split("=")
+        budgets[call_type.strip()] = float(seconds)
+    return budgets
+
+
+class CallBudget:
+    """
+    Deadline of one budgeted call. Exactly one side gets to settle the call: the worker
+    when it finishes in time, or the caller when the budget runs out (claim() decides).
+    A cancelled worker stops retrying and closes its stream at the next chunk; requests
+    are sent with the remaining time as their timeout, so none outlives the budget.
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.perf_counter() + seconds
+        self.cancelled = threading.Event()
+        self._claim = threading.Lock()
+
+    def claim(self):
+        return self._claim.acquire(blocking=False)
+
+    def remaining(self):
+        return max(0.0, self.expires - time.perf_counter())
+
+
+class ChatSession:
+    """
+    Incremental conversation for one player: a stable system message followed by
+    the user/assistant turns so far. Every call resends the same prefix, which lets
+    Ollama reuse its prompt (KV) cache instead of re-reading the whole game state.
+    """
+    def __init__(self, system_prompt):
+        self.messages = [{'role': 'system', 'content': system_prompt}]
+
+    def build_messages(self, prompt_text):
+        return self.messages + [{'role': 'user', 'content': prompt_text}]
+
+    def record(self, prompt_text, response_text):
+        self.messages.append({'role': 'user', 'content': prompt_text})
+        self.messages.append({'role': 'assistant', 'content': response_text})
+
 
 class LLMInterface:
-    def __init__(self, model_name="llama3"):
+    def __init__(self, model_name="llama3", cache=None, backend=None, structured_choices=True,
+                 choice_num_predict=24, keep_alive=None, stream_statements=False,
+                 statement_num_predict=96, statement_max_sentences=2, metrics=None, verbose=True,
+                 rng=None, choice_model=None, statement_model=None, warm_up=True, latency_budgets=None):
+        self.created_at = time.perf_counter()
         self.model_name = model_name
-        print(f"LLMInterface initialized with model: {self.model_name}")
+        # Optional per-call-type models, e.g. a small model for choices and a large one for statements
+        self.choice_model = choice_model or model_name
+        self.statement_model = statement_model or model_name
+        self.cache = cache # Optional LLMCache shared across games
+        self.backend = backend # LLMBackend; defaults to the local Ollama server
+        # Structured choices ask Ollama for JSON constrained to the valid names (format=schema),
+        # so one short generation is enough instead of free text + regex + retries.
+        self.structured_choices = structured_choices
+        self.choice_num_predict = choice_num_predict # Token cap for a {"name": ...} answer
+        self.choice_stats = {"calls": 0, "attempts": 0, "retries": 0, "fallbacks": 0}
+        self._stats_lock = threading.Lock() # Choices may run concurrently (votes, night actions)
+        self.keep_alive = keep_alive # e.g. "30m": keeps the model (and its prompt cache) resident
+        # Seconds a call type (vote, night_kill, seer_investigation, statement) may take before
+        # it is cancelled and a heuristic decides instead; None or missing = no limit
+        self.latency_budgets = latency_budgets or {}
+        self.deadline_stats = {} # call_type -> calls that ran over budget
+        self.on_fallback = None # Optional callback(call_type, player, budget_s, value), e.g. to log it
+        # Statements: streamed token by token and cut off after a few sentences or a token cap
+        self.stream_statements = stream_statements
+        self.statement_num_predict = statement_num_predict
+        self.statement_max_sentences = statement_max_sentences
+        self.stream_stats = {"streams": 0, "early_stops": 0, "ttft_total": 0.0, "ttft_max": 0.0}
+        self.last_ttft = None # Time-to-first-token of the latest streamed statement, in seconds
+        self.metrics = metrics if metrics is not None else MetricsRecorder() # Per-call latency/token records
+        self.rng = rng if rng is not None else random.Random() # For fallback choices; seeded per game
+        # Fallbacks run on the concurrent vote/night threads, so rather than sharing one stream
+        # (drawn in whatever order the threads get there) each call derives its own, see fallback_rng()
+        self._fallback_seed = self.rng.getrandbits(64)
+        self.verbose = verbose # False silences the chatty per-call prints (errors are always shown)
+        # Startup: the connectivity check and model warm-up run in the background while the
+        # game sets up; the first real call waits for them (see wait_until_ready)
+        self.warmup_s = None # How long the check + warm-up took
+        self.time_to_first_action = None # Seconds from construction to the first LLM answer
+        self._ready = threading.Event()
+        self._startup_error = None
+        if self.verbose:
+            print(f"LLMInterface initialized with model: {self.model_name}")
+        if self.cache is not None and self.cache.is_replay:
+            # Everything is served from the recording, Ollama is never contacted
+            print("LLM cache is in replay mode, skipping Ollama connectivity check.")
+            self._ready.set()
+            return
+        if self.backend is None:
+            self.backend = OllamaBackend() # Doesn't import ollama until the first request
+        threading.Thread(target=self._start_backend, args=(warm_up,), name="llm-warm-up", daemon=True).start()
+
+    def _start_backend(self, warm_up):
+        started = time.perf_counter()
         try:
-            # Check if the model is available
-            ollama.list() 
+            # Check if the server is up, then load each model this game uses
+            self.backend.check()
+            if warm_up:
+                for model in dict.fromkeys((self.choice_model, self.statement_model)):
+                    self.backend.warm_up(model, keep_alive=self.keep_alive or WARMUP_KEEP_ALIVE)
         except Exception as e:
             print(f"Error: Could not connect to Ollama or list models. Is Ollama running?")
             print(f"Details: {e}")
             print(f"Make sure you have run 'ollama pull {self.model_name}' if it's your first time.")
-            raise
+            self._startup_error = e
+        finally:
+            self.warmup_s = time.perf_counter() - started
+            self._ready.set()
+
+    def wait_until_ready(self):
+        """Blocks until the background check and warm-up are done; re-raises their error."""
+        self._ready.wait()
+        if self._startup_error is not None:
+            raise self._startup_error
+
+    def _first_action(self):
+        with self._stats_lock:
+            if self.time_to_first_action is not None:
+                return
+            self.time_to_first_action = time.perf_counter() - self.created_at
+        self.metrics.add("startup", time_to_first_action_s=self.time_to_first_action, warmup_s=self.warmup_s)
+        if self.verbose:
+            warmup = f" (warm-up took {self.warmup_s:.2f}s)" if self.warmup_s is not None else ""
+            print(f"Time to first action: {self.time_to_first_action:.2f}s{warmup}")
+
+    def new_session(self, system_prompt):
+        return ChatSession(system_prompt)
+
+    def _get_response(self, prompt_text, options=None, format=None, session=None, stream=False,
+                      on_token=None, max_sentences=None, model=None, budget=None, attempt=1):
+        model = model or self.model_name
+        if session is not None:
+            messages = session.build_messages(prompt_text)
+        else:
+            messages = [{'role': 'user', 'content': prompt_text}]
+        extra = {'format': format} if format is not None else {}
+        record = current_call()
+        if record is not None:
+            record["attempts"] += 1
+            record["prompt_bytes"] += sum(len(m['content'].encode('utf-8')) for m in messages)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(model, messages, dict(options or {}, **extra), attempt)
+            try:
+                cached = self.cache.get(cache_key)
+            except CacheMissError:
+                print(f"Replay cache has no recorded response for this prompt (model {model}).")
+                raise
+            if record is not None:
+                record["cache"] = "hit" if cached is not None else "miss"
+            if cached is not None:
+                if on_token is not None:
+                    on_token(cached)
+                if self.time_to_first_action is None:
+                    self._first_action()
+                return cached
 
-    def _get_response(self, prompt_text):
+        if self.keep_alive is not None: # Not part of the cache key, it doesn't change the answer
+            extra['keep_alive'] = self.keep_alive
+        if budget is not None:
+            # Slightly past the budget, so the caller's fallback settles the call, not a timeout error
+            extra['timeout'] = budget.remaining() + 0.25
+        self.wait_until_ready() # Outside the try: an unreachable server stops the game, as before
         try:
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[{'role': 'user', 'content': prompt_text}]
-            )
-            return response['message']['content'].strip()
+            if stream:
+                started = time.perf_counter() # Time to first token includes the request itself
+                chunks = self.backend.chat(
+                    model=model,
+                    messages=messages,
+                    options=options,
+                    stream=True,
+                    **extra
+                )
+                content = self._consume_stream(chunks, started, on_token, max_sentences, budget).strip()
+            else:
+                response = self.backend.chat(
+                    model=model,
+                    messages=messages,
+                    options=options,
+                    **extra
+                )
+                add_response_stats(record, response)
+                content = response['message']['content'].strip()
         except Exception as e:
-            print(f"Error communicating with Ollama model {self.model_name}: {e}")
-            return "Error: Could not get a response."
+            print(f"Error communicating with Ollama model {model}: {e}")
+            return "Error: Could not get a response." # Never cached, so a retry can still succeed
+
+        if cache_key is not None:
+            self.cache.put(cache_key, content, model=model)
+        if self.time_to_first_action is None:
+            self._first_action()
+        return content
+
+    @staticmethod
+    def _cut_after_sentences(text, max_sentences):
+        """Text up to the end of the max_sentences-th sentence, or None if there aren't that many yet."""
+        if not max_sentences:
+            return None
+        for count, match in enumerate(SENTENCE_END.finditer(text), start=1):
+            if count == max_sentences:
+                return text[:match.end()]
+        return None
+
+    def _consume_stream(self, chunks, started, on_token=None, max_sentences=None, budget=None):
+        """
+        Reads a streamed chat response, forwarding text to on_token as it arrives.
+        Stops reading (closing the stream) once max_sentences sentences are complete,
+        or as soon as the call's budget has run out.
+        """
+        ttft = None
+        text = ""
+        emitted = 0
+        stopped_early = False
+        try:
+            for chunk in chunks:
+                if budget is not None and budget.cancelled.is_set():
+                    stopped_early = True
+                    break
+                piece = chunk.get('message', {}).get('content', '')
+                if piece and ttft is None:
+                    ttft = time.perf_counter() - started
+                if chunk.get('done'):
+                    add_response_stats(current_call(), chunk) # Final chunk carries the counts
+                text += piece
+                cut = self._cut_after_sentences(text, max_sentences)
+                if cut is not None:
+                    text = cut
+                    stopped_early = not chunk.get('done', False)
+                if on_token is not None and len(text) > emitted:
+                    on_token(text[emitted:])
+                    emitted = len(text)
+                if cut is not None:
+                    break
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close() # Tells the backend to drop the rest of the generation
 
-    def get_player_choice(self, prompt_text, player_names_options):
+        with self._stats_lock:
+            self.stream_stats["streams"] += 1
+            self.stream_stats["early_stops"] += int(stopped_early)
+            if ttft is not None:
+                self.stream_stats["ttft_total"] += ttft
+                self.stream_stats["ttft_max"] = max(self.stream_stats["ttft_max"], ttft)
+        self.last_ttft = ttft
+        record = current_call()
+        if record is not None:
+            record["ttft_s"] = ttft
+        return text
+
+    def stream_stats_summary(self):
+        """Streaming counters plus mean time-to-first-token in seconds."""
+        with self._stats_lock:
+            stats = dict(self.stream_stats)
+        stats["ttft_mean"] = stats["ttft_total"] / stats["streams"] if stats["streams"] else 0.0
+        return stats
+
+    @staticmethod
+    def _choice_schema(player_names_options):
+        return {
+            "type": "object",
+            "properties": {"name": {"type": "string", "enum": list(player_names_options)}},
+            "required": ["name"],
+        }
+
+    def _parse_choice(self, raw_response, player_names_options, structured):
+        if structured:
+            try:
+                name = json.loads(raw_response).get("name", "")
+            except (ValueError, AttributeError):
+                name = ""
+            for option in player_names_options:
+                if option.lower() == str(name).strip().lower():
+                    return option
+            # Model ignored the schema (e.g. old Ollama): fall through to the free-text scan
+
+        # Try to find any of the player names in the response
+        for name in player_names_options:
+            if re.search(r'\b' + re.escape(name) + r'\b', raw_response, re.IGNORECASE):
+                return name
+        return None
+
+    def _count_choice(self, attempts, fell_back):
+        record = current_call()
+        if record is not None:
+            record["retries"] = attempts - 1
+            record["fallback"] = fell_back
+        with self._stats_lock:
+            self.choice_stats["calls"] += 1
+            self.choice_stats["attempts"] += attempts
+            self.choice_stats["retries"] += attempts - 1
+            self.choice_stats["fallbacks"] += int(fell_back)
+
+    def choice_stats_summary(self):
+        """Counters plus retry rate (extra generations per call) and fallback rate."""
+        with self._stats_lock:
+            stats = dict(self.choice_stats)
+        calls = stats["calls"]
+        stats["retry_rate"] = stats["retries"] / calls if calls else 0.0
+        stats["fallback_rate"] = stats["fallbacks"] / calls if calls else 0.0
+        return stats
+
+    def fallback_rng(self):
+        """
+        RNG for the current call's fallback, seeded from the game's seed and the call's tags
+        (phase, day, player, call type): the same game draws the same values at any timing.
+        """
+        tags = current_tags()
+        return random.Random(f"{self._fallback_seed}:{tags.get('phase')}:{tags.get('day')}:"
+                             f"{tags.get('player')}:{tags.get('call_type')}")
+
+    def _within_budget(self, run, fallback, session=None, full_prompt=None, as_answer=str):
+        """
+        Runs run(budget) under the latency budget of the current call type (from the tags).
+        Past the budget the call is cancelled and fallback() decides instead; with a session,
+        (full_prompt, as_answer(value)) is recorded in place of the abandoned exchange.
+        The abandoned request times out with the budget, and its answer is ignored.
+        """
+        call_type = current_tags().get("call_type")
+        seconds = self.latency_budgets.get(call_type)
+        if seconds is None:
+            return run(None)
+
+        budget = CallBudget(seconds)
+        future = Future()
+        def work():
+            try:
+                future.set_result(run(budget))
+            except BaseException as e:
+                future.set_exception(e)
+        context = contextvars.copy_context() # Keeps the call's tags and metrics record
+        threading.Thread(target=context.run, args=(work,), name="llm-budgeted-call", daemon=True).start()
+        try:
+            return future.result(timeout=seconds)
+        except FutureTimeoutError:
+            if not budget.claim():
+                return future.result() # Finished at the very last moment
+        budget.cancelled.set()
+        return self._deadline_fallback(call_type, seconds, fallback, session, full_prompt, as_answer)
+
+    def _deadline_fallback(self, call_type, seconds, fallback, session=None, full_prompt=None, as_answer=str):
+        value = fallback()
+        if session is not None: # The player's session cursors have already moved past this prompt
+            session.record(full_prompt, as_answer(value))
+        record = current_call()
+        if record is not None:
+            record["fallback"] = True
+            record["deadline_exceeded"] = True
+        with self._stats_lock:
+            self.deadline_stats[call_type] = self.deadline_stats.get(call_type, 0) + 1
+        if self.on_fallback is not None: # The callback reports it (Game logs it in the right place)
+            self.on_fallback(call_type, current_tags().get("player"), seconds, value)
+        elif self.verbose:
+            print(f"{call_type} call went over its {seconds:g}s budget; using a heuristic instead.")
+        return value
+
+    def get_player_choice(self, prompt_text, player_names_options, session=None, fallback=None):
         """
         Gets a choice from the LLM, expecting one of the player_names_options.
+        In structured mode the answer is constrained to a JSON enum of the options.
         Retries a few times if the response is not one of the options.
+        With a session, only the final exchange is kept in the conversation.
+        fallback() picks an option when the LLM keeps failing or runs over its latency
+        budget (default: a random option).
         """
+        fallback = fallback or (lambda: self.fallback_rng().choice(player_names_options))
         full_prompt = f"{prompt_text}\nChoose one name from this list: {', '.join(player_names_options)}. Respond with only the player's name."
+        if self.structured_choices:
+            full_prompt += ' Answer as JSON: {"name": "<player name>"}.'
+        with self.metrics.call(self.choice_model):
+            return self._within_budget(
+                lambda budget: self._get_player_choice(full_prompt, player_names_options, session, fallback, budget),
+                fallback, session, full_prompt, self._choice_answer)
+
+    def _choice_answer(self, name):
+        """How a choice made without the LLM is recorded in a session."""
+        return json.dumps({"name": name}) if self.structured_choices else name
+
+    def _get_player_choice(self, full_prompt, player_names_options, session, fallback, budget=None):
+        options = None
+        format = None
+        if self.structured_choices:
+            options = {'num_predict': self.choice_num_predict}
+            format = self._choice_schema(player_names_options)
         
         attempts = 0
         max_attempts = 3
         while attempts < max_attempts:
-            raw_response = self._get_response(full_prompt)
-            print(f"LLM raw choice response: {raw_response}")
-            
-            # Try to find any of the player names in the response
-            for name in player_names_options:
-                if re.search(r'\b' + re.escape(name) + r'\b', raw_response, re.IGNORECASE):
-                    return name
-            
-            print(f"LLM did not provide a valid player name. Attempt {attempts+1}/{max_attempts}.")
+            if budget is not None and budget.cancelled.is_set():
+                return None # The caller has already moved on
             attempts += 1
+            raw_response = self._get_response(full_prompt, options=options, format=format, session=session,
+                                              model=self.choice_model, budget=budget, attempt=attempts)
+            if self.verbose:
+                print(f"LLM raw choice response: {raw_response}")
+
+            name = self._parse_choice(raw_response, player_names_options, self.structured_choices)
+            if name is not None:
+                if budget is not None and not budget.claim():
+                    return None # Too late: the budget ran out and a heuristic answered
+                self._count_choice(attempts, fell_back=False)
+                if session is not None:
+                    session.record(full_prompt, raw_response)
+                return name
+            
+            if self.verbose:
+                print(f"LLM did not provide a valid player name. Attempt {attempts}/{max_attempts}.")
         
-        print(f"LLM failed to provide a valid player name after {max_attempts} attempts. Defaulting.")
-        # Fallback: pick a random valid option if LLM fails consistently
-        import random
-        return random.choice(player_names_options)
+        if budget is not None and not budget.claim():
+            return None
+        if self.verbose:
+            print(f"LLM failed to provide a valid player name after {max_attempts} attempts. Defaulting.")
+        self._count_choice(attempts, fell_back=True)
+        # Fallback: the caller's heuristic (or a random valid option) if the LLM fails consistently
+        name = fallback()
+        if session is not None:
+            session.record(full_prompt, self._choice_answer(name))
+        return name
 
 
-    def get_player_statement(self, prompt_text):
-        """Gets a general statement from the LLM."""
+    def get_player_statement(self, prompt_text, session=None, on_token=None, fallback=None):
+        """
+        Gets a general statement from the LLM.
+        In streaming mode text is passed to on_token as it is generated, and generation
+        stops after statement_max_sentences sentences.
+        fallback() supplies the statement if the call runs over its latency budget.
+        """
+        fallback = fallback or (lambda: "I have nothing to add right now.")
         full_prompt = f"{prompt_text}\nKeep your statement concise, ideally one or two sentences."
-        return self._get_response(full_prompt)
\ No newline at end of file
+        with self.metrics.call(self.statement_model):
+            return self._within_budget(
+                lambda budget: self._get_player_statement(full_prompt, session, on_token, budget),
+                fallback, session, full_prompt)
+
+    def _get_player_statement(self, full_prompt, session, on_token, budget=None):
+        options = {'num_predict': self.statement_num_predict} if self.statement_num_predict else None
+        if self.stream_statements:
+            statement = self._get_response(full_prompt, options=options, session=session, stream=True,
+                                           on_token=on_token, max_sentences=self.statement_max_sentences,
+                                           model=self.statement_model, budget=budget)
+        else:
+            statement = self._get_response(full_prompt, options=options, session=session,
+                                           model=self.statement_model, budget=budget)
+        if budget is not None and not budget.claim():
+            return None # Too late: the budget ran out and a heuristic answered
+        if session is not None:
+            session.record(full_prompt, statement)
+        return statement
\ No newline at end of file
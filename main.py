@@ -1,18 +1,20 @@
 # main.py
+import os
+
 from game import Game
 
 if __name__ == "__main__":
     print("Starting Werewolf LLM Game...")
     
     num_players = 0
-    while num_players < 3 or num_players > 10: # Min 3 players for 1W,1S,1V. Max 10 for sanity.
+    while num_players < 3 or num_players > 100: # Min 3 players for 1W,1S,1V. Max 100 for sanity.
         try:
-            num_players_str = input("Enter number of players (e.g., 3-10): ")
+            num_players_str = input("Enter number of players (e.g., 3-100): ")
             num_players = int(num_players_str)
             if num_players < 3:
                 print("Minimum 3 players required.")
-            if num_players > 10: # Arbitrary upper limit for this simple version
-                print("Maximum 10 players for this version. For more, role distribution needs adjustment.")
+            if num_players > 100: # Every player is an LLM agent; bigger games belong in benchmark.py
+                print("Maximum 100 players for interactive games.")
         except ValueError:
             print("Invalid input. Please enter a number.")
 
@@ -20,8 +22,16 @@ if __name__ == "__main__":
     if not llm_model_name.strip():
         llm_model_name = "llama3"
     
+    # OLLAMA_HOSTS=http://gpu1:11434,http://gpu2:11434 spreads the game over several servers
+    backend = None
+    hosts = [h.strip() for h in os.environ.get("OLLAMA_HOSTS", "").split(",") if h.strip()]
+    if len(hosts) > 1:
+        from endpoint_pool import EndpointPool
+        backend = EndpointPool(hosts, hedge=True)
+        backend.start_health_checks()
+
     try:
-        game_instance = Game(num_players=num_players, llm_model=llm_model_name)
+        game_instance = Game(num_players=num_players, llm_model=llm_model_name, backend=backend)
         game_instance.run_game()
     except Exception as e:
         print(f"\nAn error occurred during game initialization or execution: {e}")
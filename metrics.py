@@ -0,0 +1,183 @@
+# metrics.py
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Tags (call_type, player, role, day, phase) that apply to LLM calls made in the current context
+_call_tags = contextvars.ContextVar("llm_call_tags", default={})
+# Record of the LLM call currently in progress, filled in by LLMInterface._get_response
+_current_call = contextvars.ContextVar("llm_current_call", default=None)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Ollama response fields summed over every generation of a call
+RESPONSE_FIELDS = ("prompt_eval_count", "eval_count", "prompt_eval_duration", "eval_duration")
+
+
+@contextmanager
+def tagged(**tags):
+    """Adds tags to every LLM call and phase recorded inside the block."""
+    token = _call_tags.set({**_call_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _call_tags.reset(token)
+
+
+def current_tags():
+    return dict(_call_tags.get())
+
+
+def current_call():
+    """The record of the LLM call in progress in this context, or None."""
+    return _current_call.get()
+
+
+def add_response_stats(record, response):
+    """Adds one Ollama response's token counts and durations to a call record."""
+    if record is None or not response:
+        return
+    for field in RESPONSE_FIELDS:
+        value = response.get(field)
+        if value is not None:
+            record[field] = record.get(field, 0) + value
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    inner = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items() if value is not None)
+    return "{" + inner + "}" if inner else ""
+
+
+class MetricsRecorder:
+    """
+    Collects structured metrics for LLM calls and game phases.
+    Every record is a flat dict; export with write_jsonl() or to_prometheus().
+    """
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock() # Calls are recorded from the concurrent pools
+
+    def _add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def add(self, kind, **fields):
+        """Records a one-off measurement, e.g. add("startup", time_to_first_action_s=...)."""
+        record = {"kind": kind, "ts": time.time(), **fields}
+        record.update(current_tags())
+        self._add(record)
+        return record
+
+    def records_of(self, kind):
+        with self._lock:
+            return [r for r in self.records if r["kind"] == kind]
+
+    @contextmanager
+    def call(self, model=None):
+        """
+        Wraps one logical LLM call (all its attempts). Yields the record so the caller
+        can add fields such as retries; generations add their stats via current_call().
+        """
+        record = {
+            "kind": "llm_call", "ts": time.time(), "model": model,
+            "attempts": 0, "retries": 0, "fallback": False, "cache": "off", "prompt_bytes": 0,
+            "error": None,
+        }
+        record.update(current_tags())
+        token = _current_call.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["wall_time_s"] = time.perf_counter() - started
+            _current_call.reset(token)
+            self._add(record)
+
+    @contextmanager
+    def phase(self, name, **tags):
+        """Times a game phase; LLM calls made inside are tagged with the phase and its tags."""
+        record = {"kind": "phase", "ts": time.time(), "phase": name}
+        record.update(current_tags())
+        record.update(tags)
+        started = time.perf_counter()
+        try:
+            with tagged(phase=name, **tags):
+                yield record
+        finally:
+            record["wall_time_s"] = time.perf_counter() - started
+            self._add(record)
+
+    def calls(self):
+        with self._lock:
+            return [r for r in self.records if r["kind"] == "llm_call"]
+
+    def phases(self):
+        with self._lock:
+            return [r for r in self.records if r["kind"] == "phase"]
+
+    def reset(self):
+        with self._lock:
+            self.records = []
+
+    def write_jsonl(self, path_or_file):
+        """One JSON object per line; accepts a path or an open text file."""
+        with self._lock:
+            records = list(self.records)
+        if hasattr(path_or_file, "write"):
+            for record in records:
+                path_or_file.write(json.dumps(record) + "\n")
+            return
+        with open(path_or_file, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def to_prometheus(self, prefix="werewolf"):
+        """Prometheus text exposition format (counters and latency histograms)."""
+        calls = self.calls()
+        phases = self.phases()
+        lines = []
+
+        counters = defaultdict(lambda: defaultdict(float))
+        for record in calls:
+            key = (record.get("call_type"), record.get("role"), record.get("cache"))
+            counters["llm_calls_total"][key] += 1
+            counters["llm_retries_total"][key] += record["retries"]
+            counters["llm_fallbacks_total"][key] += int(record["fallback"])
+            counters["llm_prompt_eval_tokens_total"][key] += record.get("prompt_eval_count", 0)
+            counters["llm_eval_tokens_total"][key] += record.get("eval_count", 0)
+            counters["llm_eval_seconds_total"][key] += record.get("eval_duration", 0) / 1e9
+        for metric, series in counters.items():
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for (call_type, role, cache), value in sorted(series.items(), key=lambda kv: str(kv[0])):
+                lines.append(f"{prefix}_{metric}{_labels(call_type=call_type, role=role, cache=cache)} {value:g}")
+
+        lines += self._histogram(f"{prefix}_llm_call_seconds", "call_type",
+                                 [(r.get("call_type"), r["wall_time_s"]) for r in calls])
+        lines += self._histogram(f"{prefix}_phase_seconds", "phase",
+                                 [(r["phase"], r["wall_time_s"]) for r in phases])
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram(name, label, samples):
+        grouped = defaultdict(list)
+        for label_value, seconds in samples:
+            grouped[label_value].append(seconds)
+        lines = [f"# TYPE {name} histogram"]
+        for label_value in sorted(grouped, key=str):
+            values = grouped[label_value]
+            for bound in LATENCY_BUCKETS:
+                count = sum(1 for v in values if v <= bound)
+                lines.append(f"{name}_bucket{_labels(**{label: label_value, 'le': f'{bound:g}'})} {count}")
+            lines.append(f"{name}_bucket{_labels(**{label: label_value, 'le': '+Inf'})} {len(values)}")
+            lines.append(f"{name}_sum{_labels(**{label: label_value})} {sum(values):g}")
+            lines.append(f"{name}_count{_labels(**{label: label_value})} {len(values)}")
+        return lines
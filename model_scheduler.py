@@ -0,0 +1,192 @@
+# model_scheduler.py
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from llm_backends import LLMBackend, WarmedModels
+
+_STREAM_END = object()
+
+
+class _Job:
+    __slots__ = ("model", "fn", "future", "queued_at")
+
+    def __init__(self, model, fn):
+        self.model = model
+        self.fn = fn
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class ModelAffinityScheduler:
+    """
+    Orders LLM requests from many concurrent games so the server keeps one model resident.
+    Requests are queued per model. The scheduler keeps draining the resident model's queue
+    (up to max_in_flight at once) and only switches once that queue is empty, or after
+    max_drain consecutive requests so other models don't starve. Before a switch, the old
+    model's in-flight requests finish first, so two models never compete for memory.
+    The next model is the one with the most waiting requests (oldest request breaks ties).
+    """
+    def __init__(self, max_in_flight=4, max_drain=None):
+        self.max_in_flight = max_in_flight
+        self.max_drain = max_drain # None: drain a model's queue completely before switching
+        self.current_model = None
+        self.switches = 0
+        self.served = {} # model -> requests dispatched
+
+        self._queues = {} # model -> deque of _Job
+        self._in_flight = 0
+        self._drained = 0 # Requests dispatched since the last switch
+        self._closed = False
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="model-affinity")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="model-affinity-dispatch",
+                                            daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, model, fn):
+        """Queues fn() to run while `model` is resident. Returns a concurrent.futures.Future."""
+        job = _Job(model, fn)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down.")
+            self._queues.setdefault(model, deque()).append(job)
+            self._cond.notify_all()
+        return job.future
+
+    def pending(self):
+        with self._cond:
+            return {model: len(jobs) for model, jobs in self._queues.items() if jobs}
+
+    def _select_model(self):
+        """Model to dispatch from next, or None if we must wait (full, or switching)."""
+        if self._in_flight >= self.max_in_flight:
+            return None
+        waiting = {model: jobs for model, jobs in self._queues.items() if jobs}
+        if not waiting:
+            return None
+
+        current_has_work = self.current_model in waiting
+        drain_left = self.max_drain is None or self._drained < self.max_drain
+        if current_has_work and (drain_left or len(waiting) == 1):
+            if not drain_left:
+                self._drained = 0 # Nobody else is waiting; start a new residency
+            return self.current_model
+
+        if self._in_flight:
+            return None # Let the resident model finish before loading another one
+        if current_has_work and not drain_left:
+            del waiting[self.current_model] # Drain limit reached: hand over to a waiting model
+        return max(waiting, key=lambda m: (len(waiting[m]), -waiting[m][0].queued_at))
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                model = self._select_model()
+                while model is None:
+                    if self._closed and not any(self._queues.values()):
+                        return
+                    self._cond.wait()
+                    model = self._select_model()
+
+                if model != self.current_model:
+                    if self.current_model is not None:
+                        self.switches += 1
+                    self.current_model = model
+                    self._drained = 0
+                job = self._queues[model].popleft()
+                self._in_flight += 1
+                self._drained += 1
+                self.served[model] = self.served.get(model, 0) + 1
+            self._pool.submit(self._execute, job)
+
+    def _execute(self, job):
+        try:
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn())
+                except BaseException as e:
+                    job.future.set_exception(e)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def shutdown(self, wait=True):
+        """Stops accepting work; queued requests still run."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            self._dispatcher.join()
+            self._pool.shutdown(wait=True)
+
+    def stats(self):
+        with self._cond:
+            return {"current_model": self.current_model, "switches": self.switches,
+                    "served": dict(self.served), "in_flight": self._in_flight,
+                    "pending": sum(len(jobs) for jobs in self._queues.values())}
+
+
+class ScheduledBackend(LLMBackend):
+    """
+    Routes a backend's chat calls through a ModelAffinityScheduler. Share one instance
+    (or one scheduler) between all games that talk to the same server.
+    """
+    name = "scheduled"
+
+    def __init__(self, backend, scheduler):
+        self.backend = backend
+        self.scheduler = scheduler
+        self._warmed = WarmedModels() # Shared by many games: warm each model up once
+
+    def check(self):
+        self.backend.check()
+
+    def warm_up(self, model, keep_alive=None):
+        # The wrapped backend decides what a warm-up is (a no-op for ScriptedBackend); it runs
+        # through the scheduler so loading a model doesn't cut into another model's residency
+        self._warmed.warm_up(model, lambda: self.scheduler.submit(
+            model, lambda: self.backend.warm_up(model, keep_alive)).result())
+
+    def chat(self, model, messages, options=None, stream=False, **kwargs):
+        if stream:
+            return self._stream(model, messages, options, **kwargs)
+        future = self.scheduler.submit(
+            model, lambda: self.backend.chat(model=model, messages=messages, options=options, **kwargs))
+        return future.result()
+
+    def _stream(self, model, messages, options, **kwargs):
+        """
+        The scheduled job pumps chunks into a queue and holds the model's slot until the
+        stream ends; closing this generator early also stops the pump.
+        """
+        chunks = queue.Queue()
+        stop = threading.Event()
+
+        def pump():
+            try:
+                stream = self.backend.chat(model=model, messages=messages, options=options, stream=True, **kwargs)
+                try:
+                    for chunk in stream:
+                        if stop.is_set():
+                            break
+                        chunks.put(chunk)
+                finally:
+                    if hasattr(stream, "close"):
+                        stream.close()
+            finally:
+                chunks.put(_STREAM_END)
+
+        future = self.scheduler.submit(model, pump)
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _STREAM_END:
+                    break
+                yield chunk
+            future.result() # Re-raises errors from the backend
+        finally:
+            stop.set()
@@ -0,0 +1,255 @@
+# monte_carlo.py
+"""
+Vectorized Monte Carlo engine for role-balance questions.
+
+Plays thousands of games at once with NumPy, using the same rules as Game: roles from
+role_distribution(), the pack kill (plurality, ties to the earliest wolf) applied at
+dawn, lynch only on a clear plurality (a tie means no lynch), the same game-over checks,
+and the same day limit. Players are not LLMs but simple probabilistic policies (Policy).
+Needs NumPy, unlike the rest of the project.
+
+    python monte_carlo.py --players 5-15 --games 100000
+    python monte_carlo.py --players 8 --wolves 1,2 --seers 0,1,2 --follow-rate 0.8 --json
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from batch_runner import wilson_interval
+from game import role_distribution
+
+DAY_LIMIT = 20 # Game.run_game stops once day_number > DAY_LIMIT
+MAX_BATCH_CELLS = 4_000_000 # games * players * players per batch; bounds memory of the vote step
+
+
+class Policy:
+    """
+    How the simulated players behave.
+    - seer_accuracy: chance a vision is correct (1.0 = the game's Seer).
+    - seer_reveal: chance per day that a living seer tells the town whom they suspect.
+    - follow_rate: chance a town player votes for a suspect they know of (seers always know
+      their own findings; everyone else only the revealed ones), instead of a random player.
+    - wolf_coordination: chance per night/day that the wolves all pick the same victim/vote.
+    All zeros (with seer_accuracy 1) is fully random play, like the scripted test backend.
+    """
+    def __init__(self, seer_accuracy=1.0, seer_reveal=0.5, follow_rate=0.6, wolf_coordination=1.0):
+        self.seer_accuracy = seer_accuracy
+        self.seer_reveal = seer_reveal
+        self.follow_rate = follow_rate
+        self.wolf_coordination = wolf_coordination
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _random_pick(rng, valid):
+    """One uniformly random True index along the last axis (-1 where there is none)."""
+    keys = np.where(valid, rng.random(valid.shape), -1.0)
+    choice = keys.argmax(axis=-1)
+    return np.where(valid.any(axis=-1), choice, -1)
+
+
+def _game_over(alive, is_wolf, active, winner, days, day):
+    """_check_game_over for every active game; finished games leave `active`."""
+    wolves = (alive & is_wolf).sum(axis=1)
+    town = alive.sum(axis=1) - wolves
+    villagers_win = active & (wolves == 0)
+    wolves_win = active & ~villagers_win & (wolves >= town)
+    winner[villagers_win] = 1
+    winner[wolves_win] = 2
+    days[villagers_win | wolves_win] = day
+    active &= ~(villagers_win | wolves_win)
+
+
+def _play_batch(rng, games, num_werewolves, num_seers, num_villagers, policy):
+    n = num_werewolves + num_seers + num_villagers
+    # Seating is irrelevant to symmetric policies, so roles sit in blocks: wolves, seers, villagers
+    is_wolf = np.zeros(n, dtype=bool)
+    is_wolf[:num_werewolves] = True
+    is_seer = np.zeros(n, dtype=bool)
+    is_seer[num_werewolves:num_werewolves + num_seers] = True
+    not_self = ~np.eye(n, dtype=bool)
+    rows = np.arange(games)
+
+    alive = np.ones((games, n), dtype=bool)
+    investigated = np.zeros((games, n), dtype=bool) # Pooled over the town's seers
+    suspected = np.zeros((games, n), dtype=bool) # Seer visions that said "Werewolf"
+    revealed = np.zeros((games, n), dtype=bool) # Suspicions the seers have made public
+    active = np.ones(games, dtype=bool)
+    winner = np.zeros(games, dtype=np.int8) # 0 = day limit, 1 = villagers, 2 = werewolves
+    days = np.zeros(games, dtype=np.int16)
+
+    _game_over(alive, is_wolf, active, winner, days, 0)
+    day = 0
+    while active.any():
+        day += 1
+
+        # --- Night: every action sees the same snapshot; the kill is applied at dawn ---
+        snapshot = alive & active[:, None]
+        for seer in np.flatnonzero(is_seer):
+            acting = snapshot[:, seer]
+            target = _random_pick(rng, snapshot & ~investigated & (np.arange(n) != seer))
+            looks = acting & (target >= 0)
+            t = np.where(looks, target, 0)
+            correct = rng.random(games) < policy.seer_accuracy
+            says_wolf = is_wolf[t] == correct # A wrong vision flips the answer
+            investigated[rows[looks], t[looks]] = True
+            suspected[rows[looks & says_wolf], t[looks & says_wolf]] = True
+
+        victims = snapshot & ~is_wolf
+        shared = _random_pick(rng, victims)
+        coordinated = rng.random(games) < policy.wolf_coordination
+        wolf_ids = np.flatnonzero(is_wolf)
+        choices = np.stack([
+            np.where(snapshot[:, w], np.where(coordinated, shared, _random_pick(rng, victims)), -1)
+            for w in wolf_ids
+        ], axis=1)
+        # Plurality of the wolves' choices; argmax picks the earliest wolf on ties
+        support = ((choices[:, :, None] == choices[:, None, :]) & (choices[:, None, :] >= 0)).sum(axis=2)
+        support[choices < 0] = -1
+        kill = choices[rows, support.argmax(axis=1)]
+        killed = active & (kill >= 0)
+        alive[rows[killed], kill[killed]] = False
+        _game_over(alive, is_wolf, active, winner, days, day)
+
+        # --- Day: seers may go public, then everyone votes at once ---
+        seer_alive = (alive & is_seer).any(axis=1)
+        reveal = active & seer_alive & (rng.random(games) < policy.seer_reveal)
+        revealed |= suspected & reveal[:, None]
+
+        voters = alive & active[:, None]
+        candidates = voters[:, None, :] & not_self[None, :, :] # [game, voter, candidate]
+        votes = _random_pick(rng, candidates)
+
+        # Town: follow a known, living suspect with probability follow_rate
+        public_suspect = _random_pick(rng, revealed & alive)
+        own_suspect = _random_pick(rng, suspected & alive)
+        follows = rng.random((games, n)) < policy.follow_rate
+        town_target = np.where(is_seer[None, :] & (own_suspect[:, None] >= 0), own_suspect[:, None],
+                               public_suspect[:, None])
+        town_target = np.where(town_target == np.arange(n), -1, town_target) # Never oneself
+        use_suspect = ~is_wolf[None, :] & follows & (town_target >= 0)
+        votes = np.where(use_suspect, town_target, votes)
+
+        # Wolves: vote for a random townsperson, all for the same one when coordinated
+        wolf_candidates = candidates & ~is_wolf[None, None, :]
+        wolf_votes = _random_pick(rng, wolf_candidates)
+        shared_vote = _random_pick(rng, voters & ~is_wolf)
+        together = (rng.random(games) < policy.wolf_coordination)[:, None]
+        wolf_votes = np.where(together & (shared_vote[:, None] >= 0), shared_vote[:, None], wolf_votes)
+        votes = np.where(is_wolf[None, :], wolf_votes, votes)
+
+        cast = voters & (votes >= 0)
+        tally = np.bincount((rows[:, None] * n + votes)[cast], minlength=games * n).reshape(games, n)
+        top = tally.max(axis=1)
+        clear = active & (top > 0) & ((tally == top[:, None]).sum(axis=1) == 1) # Tie = no lynch
+        lynched = tally.argmax(axis=1)
+        alive[rows[clear], lynched[clear]] = False
+        _game_over(alive, is_wolf, active, winner, days, day)
+
+        if day > DAY_LIMIT:
+            days[active] = day
+            active[:] = False
+    return winner, days
+
+
+def simulate(num_players, games, policy=None, num_werewolves=None, num_seers=None, seed=None):
+    """
+    Plays `games` games and returns outcome counts. Role counts default to role_distribution().
+    Batches are sized so memory stays bounded however many games are asked for.
+    """
+    policy = policy or Policy()
+    default_wolves, default_seers, _ = role_distribution(num_players)
+    num_werewolves = default_wolves if num_werewolves is None else num_werewolves
+    num_seers = default_seers if num_seers is None else num_seers
+    num_villagers = num_players - num_werewolves - num_seers
+    if num_werewolves < 1 or num_seers < 0 or num_villagers < 1:
+        raise ValueError(f"Invalid role mix for {num_players} players: {num_werewolves} werewolf(s), {num_seers} seer(s).")
+
+    rng = np.random.default_rng(seed)
+    batch_size = max(1, MAX_BATCH_CELLS // (num_players * num_players))
+    wins = {"Villagers": 0, "Werewolves": 0, "none": 0}
+    days_sum = 0
+    remaining = games
+    while remaining:
+        batch = min(batch_size, remaining)
+        winner, days = _play_batch(rng, batch, num_werewolves, num_seers, num_villagers, policy)
+        counts = np.bincount(winner, minlength=3)
+        wins["none"] += int(counts[0])
+        wins["Villagers"] += int(counts[1])
+        wins["Werewolves"] += int(counts[2])
+        days_sum += int(days.sum())
+        remaining -= batch
+    return {
+        "players": num_players, "werewolves": num_werewolves, "seers": num_seers, "villagers": num_villagers,
+        "games": games, "wins": wins, "mean_days": days_sum / games if games else 0.0,
+        "win_rates": {w: {"rate": c / games, "ci95": wilson_interval(c, games)} for w, c in wins.items()},
+    }
+
+
+def parse_counts(value):
+    """ "5-9" or "5,7,9" -> [5, 6, 7, 8, 9] / [5, 7, 9]."""
+    counts = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            low, high = part.split("-")
+            counts.extend(range(int(low), int(high) + 1))
+        elif part:
+            counts.append(int(part))
+    return counts
+
+
+def print_table(rows):
+    header = f"{'players':>7} {'wolves':>6} {'seers':>5} {'P(villagers)':>14} {'P(werewolves)':>14} {'P(limit)':>9} {'days':>6}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        rates = r["win_rates"]
+        low, high = rates["Villagers"]["ci95"]
+        print(f"{r['players']:>7} {r['werewolves']:>6} {r['seers']:>5} "
+              f"{rates['Villagers']['rate']:>7.1%} ±{(high - low) / 2:>5.1%} {rates['Werewolves']['rate']:>14.1%} "
+              f"{rates['none']['rate']:>9.2%} {r['mean_days']:>6.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo win probabilities by player count and role mix.")
+    parser.add_argument("--players", default="5-15", help='Player counts, e.g. "5-15" or "6,8,10".')
+    parser.add_argument("--wolves", help="Werewolf counts to try (default: role_distribution).")
+    parser.add_argument("--seers", help="Seer counts to try (default: role_distribution).")
+    parser.add_argument("--games", type=int, default=100_000, help="Games per table row.")
+    parser.add_argument("--seer-accuracy", type=float, default=1.0)
+    parser.add_argument("--seer-reveal", type=float, default=0.5)
+    parser.add_argument("--follow-rate", type=float, default=0.6)
+    parser.add_argument("--wolf-coordination", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the rows as JSON.")
+    args = parser.parse_args(argv)
+
+    policy = Policy(seer_accuracy=args.seer_accuracy, seer_reveal=args.seer_reveal,
+                    follow_rate=args.follow_rate, wolf_coordination=args.wolf_coordination)
+    rows = []
+    started = time.perf_counter()
+    for num_players in parse_counts(args.players):
+        default_wolves, default_seers, _ = role_distribution(num_players)
+        for wolves in parse_counts(args.wolves) if args.wolves else [default_wolves]:
+            for seers in parse_counts(args.seers) if args.seers else [default_seers]:
+                if num_players - wolves - seers < 1:
+                    continue
+                rows.append(simulate(num_players, args.games, policy, wolves, seers, seed=args.seed))
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps({"policy": policy.as_dict(), "rows": rows}, indent=2))
+    else:
+        print_table(rows)
+        total = sum(r["games"] for r in rows)
+        print(f"\n{total} games in {elapsed:.1f}s ({total / elapsed:,.0f} games/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# night_scheduler.py
+from collections import Counter
+
+from concurrency import current_log, run_ordered, DEFAULT_MAX_CONCURRENCY
+
+
+class BufferedLog:
+    """
+    Collects log messages from one task so they can be replayed in a fixed order.
+    Deferred actions (e.g. emitting an event) are replayed in the same order.
+    """
+    def __init__(self):
+        self.messages = []
+
+    def __call__(self, message):
+        self.messages.append(message)
+
+    def defer(self, action):
+        self.messages.append(action)
+
+    def wrap(self, task):
+        """task, run with this buffer as the context's current_log."""
+        def run(*args, **kwargs):
+            token = current_log.set(self)
+            try:
+                return task(*args, **kwargs)
+            finally:
+                current_log.reset(token)
+        return run
+
+    def flush_to(self, log_callback):
+        for message in self.messages:
+            if callable(message):
+                message()
+            else:
+                log_callback(message)
+        self.messages = []
+
+
+class NightActionScheduler:
+    """
+    Runs every role's night action concurrently and hands back the results in a fixed order.
+    A role takes part at night if its class sets `night_order` (lower acts first).
+    Ties between players of the same role are broken by seating order.
+    """
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+
+    def get_actors(self, alive_players):
+        actors = [p for p in alive_players if p.night_order is not None]
+        seat = {id(p): i for i, p in enumerate(alive_players)}
+        return sorted(actors, key=lambda p: (p.night_order, seat[id(p)]))
+
+    def run(self, alive_players, game_log_callback):
+        """
+        Every actor sees the same snapshot of alive players. Nothing is applied here:
+        the caller resolves the returned [(player, result), ...] list at dawn.
+        """
+        actors = self.get_actors(alive_players)
+        buffers = [BufferedLog() for _ in actors]
+        snapshot = list(alive_players)
+
+        tasks = [
+            buffer.wrap(lambda actor=actor, buffer=buffer: actor.night_action(snapshot, buffer))
+            for actor, buffer in zip(actors, buffers)
+        ]
+        results = run_ordered(tasks, self.max_concurrency)
+
+        # Replay each actor's log in resolution order so the output never interleaves
+        for buffer in buffers:
+            buffer.flush_to(game_log_callback)
+        return list(zip(actors, results))
+
+
+def choose_pack_target(werewolf_choices):
+    """Pack kill is the most chosen victim; ties go to the earliest wolf's choice."""
+    choices = [target for target in werewolf_choices if target is not None]
+    if not choices:
+        return None
+    counts = Counter(target.name for target in choices)
+    top = max(counts.values())
+    for target in choices:
+        if counts[target.name] == top:
+            return target
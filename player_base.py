@@ -1,52 +1,117 @@
 # player_base.py
+import heuristics
 from llm_interface import LLMInterface
+from metrics import tagged
+from prompt_builder import StateSummaryBuilder
 
 class Player:
+    night_order = None # Roles with a night action set this; lower values resolve first at dawn
+    # Fixed attribute set: large simulated games hold thousands of players
+    __slots__ = ("name", "role", "is_alive", "llm_interface", "known_information", "_known_set",
+                 "chat_session", "_session_alive", "_session_info_sent", "_session_statements",
+                 "summary_builder", "last_discussion")
+
     def __init__(self, name: str, llm_interface: LLMInterface):
         self.name = name
         self.role = self.__class__.__name__ # Villager, Werewolf, Seer
         self.is_alive = True
         self.llm_interface = llm_interface
         self.known_information = [] # List of strings, e.g., "PlayerX is a Werewolf"
+        self._known_set = set() # Same entries, for O(1) duplicate checks
+        self.chat_session = None # Set by start_chat_session(); None means one-shot prompts
+        self._session_alive = None # Alive players last sent to the session
+        self._session_info_sent = 0 # How many known_information entries the session has seen
+        self._session_statements = [] # Today's statements the session has seen
+        self.summary_builder = StateSummaryBuilder(self) # Caches the unchanged parts of the summary
+        self.last_discussion = [] # The latest full day discussion this player voted on (for fallbacks)
 
     def __str__(self):
         return f"{self.name} ({self.role}{', Dead' if not self.is_alive else ''})"
 
+    def _objective(self):
+        return ('help the Villagers win by eliminating Werewolves' if self.role != 'Werewolf'
+                else 'eliminate Villagers until your numbers are equal or greater')
+
     def get_game_state_summary(self, players, daytime_discussion=None):
         """Creates a summary of the game state for the LLM."""
+        return self.summary_builder.build(players, daytime_discussion)
+
+    def set_prompt_budget(self, max_tokens=None, discussion_window=None):
+        """Bounds the summary: token budget and/or last N statements kept verbatim (None = unbounded)."""
+        self.summary_builder.max_tokens = max_tokens
+        self.summary_builder.discussion_window = discussion_window
+
+    def start_chat_session(self):
+        """Switches this player to an incremental chat session (role and objective in the system message)."""
+        self.chat_session = self.llm_interface.new_session(
+            f"You are {self.name}, playing a game of Werewolf as a {self.role}. "
+            f"Your objective is to {self._objective()}. "
+            "You will receive game events as they happen and be asked to speak, vote or act."
+        )
+        self._session_alive = None
+        self._session_info_sent = 0
+        self._session_statements = []
+
+    def _session_update(self, players, daytime_discussion=None):
+        """Only what changed since this player's last call: alive players, new info, new statements."""
+        parts = []
         alive_players = [p.name for p in players if p.is_alive]
-        summary = f"You are {self.name}, a {self.role}.\n"
-        summary += f"Your objective is to {'help the Villagers win by eliminating Werewolves' if self.role != 'Werewolf' else 'eliminate Villagers until your numbers are equal or greater'}.\n"
-        summary += f"Players currently alive: {', '.join(alive_players)}.\n"
-        
-        if self.known_information:
-            summary += "Information you know:\n"
-            for info in self.known_information:
-                summary += f"- {info}\n"
-        
-        if daytime_discussion:
-            summary += "\nPrevious statements from today's discussion:\n"
-            for speaker, statement in daytime_discussion:
-                summary += f"- {speaker}: \"{statement}\"\n"
-        return summary
+        if alive_players != self._session_alive:
+            parts.append(f"Players currently alive: {', '.join(alive_players)}.")
+            self._session_alive = alive_players
+
+        new_info = self.known_information[self._session_info_sent:]
+        if new_info:
+            parts.append("New information you know:\n" + "\n".join(f"- {info}" for info in new_info))
+            self._session_info_sent = len(self.known_information)
+
+        if daytime_discussion is not None:
+            seen = len(self._session_statements)
+            if daytime_discussion[:seen] != self._session_statements:
+                seen = 0 # A new day's discussion
+            new_statements = daytime_discussion[seen:]
+            if new_statements:
+                parts.append("New statements from today's discussion:\n" + "\n".join(
+                    f"- {speaker}: \"{statement}\"" for speaker, statement in new_statements))
+            self._session_statements = list(daytime_discussion)
+
+        if not parts:
+            parts.append("Nothing new has happened since your last decision.")
+        return "\n".join(parts) + "\n"
+
+    def get_prompt_context(self, players, daytime_discussion=None):
+        """Game state to put before a question: a full summary, or just the delta in session mode."""
+        if self.chat_session is not None:
+            return self._session_update(players, daytime_discussion)
+        return self.get_game_state_summary(players, daytime_discussion=daytime_discussion)
 
     def night_action(self, players, game_log_callback):
-        """Placeholder for night actions. Overridden by Werewolf and Seer."""
-        pass # Villagers do nothing at night
+        """
+        Placeholder for night actions. Overridden by Werewolf and Seer.
+        Must not change game state other than the player's own knowledge: the returned
+        value is resolved by the game at dawn, after every role has acted.
+        """
+        return None # Villagers do nothing at night
 
-    def daytime_statement(self, players, discussion_history):
-        """LLM generates a statement for the day."""
-        game_state = self.get_game_state_summary(players, daytime_discussion=discussion_history)
+    def daytime_statement(self, players, discussion_history, on_token=None):
+        """LLM generates a statement for the day. on_token receives streamed text, if streaming is on."""
+        game_state = self.get_prompt_context(players, daytime_discussion=discussion_history)
         prompt = (
             f"{game_state}\n"
             "It's daytime discussion. What do you want to say to the group? "
             "Consider your role and what you know. Be persuasive or deceptive as your role requires."
         )
-        return self.llm_interface.get_player_statement(prompt)
+        alive_names = [p.name for p in players if p.is_alive]
+        fallback = lambda: heuristics.statement(self.name, discussion_history, alive_names,
+                                                self.llm_interface.fallback_rng())
+        with tagged(call_type="statement", player=self.name, role=self.role):
+            return self.llm_interface.get_player_statement(prompt, session=self.chat_session, on_token=on_token,
+                                                           fallback=fallback)
 
     def vote(self, players, discussion_history):
         """LLM decides who to vote for lynching."""
-        game_state = self.get_game_state_summary(players, daytime_discussion=discussion_history)
+        self.last_discussion = discussion_history
+        game_state = self.get_prompt_context(players, daytime_discussion=discussion_history)
         
         # Filter out self from voting options if desired, or dead players
         vote_options = [p.name for p in players if p.is_alive and p.name != self.name]
@@ -66,9 +131,13 @@ class Player:
             "It's time to vote for lynching. Based on the discussion and your knowledge, "
             f"who do you vote to lynch? Your role is {self.role}."
         )
-        chosen_player_name = self.llm_interface.get_player_choice(prompt, vote_options)
+        fallback = lambda: heuristics.vote_target(vote_options, discussion_history, self.llm_interface.fallback_rng())
+        with tagged(call_type="vote", player=self.name, role=self.role):
+            chosen_player_name = self.llm_interface.get_player_choice(prompt, vote_options, session=self.chat_session,
+                                                                      fallback=fallback)
         return chosen_player_name
 
     def add_known_info(self, info_string):
-        if info_string not in self.known_information:
+        if info_string not in self._known_set:
+            self._known_set.add(info_string)
             self.known_information.append(info_string)
\ No newline at end of file
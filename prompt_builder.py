@@ -0,0 +1,134 @@
+# prompt_builder.py
+import re
+from collections import Counter
+
+CHARS_PER_TOKEN = 4 # Rough estimate, good enough for budgeting prompts
+SUMMARY_TOP_MENTIONS = 5
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+class StateSummaryBuilder:
+    """
+    Builds Player.get_game_state_summary() text incrementally for one player.
+    The unchanged parts (header, known information, rendered statements) are cached
+    between calls, so each call only renders what is new.
+
+    Optional bounds keep prompts from growing with the day's discussion:
+    - discussion_window: keep at most the last N statements verbatim.
+    - max_tokens: token budget for the whole summary; fewer statements are kept
+      verbatim until it fits.
+    Statements that fall out of the window are folded into a rolling summary
+    (how many there were and who was mentioned most). That summary has a fixed size.
+    Without bounds the output is identical to the plain full summary.
+    """
+    def __init__(self, player, max_tokens=None, discussion_window=None):
+        self.player = player
+        self.max_tokens = max_tokens
+        self.discussion_window = discussion_window
+
+        self._header = None
+        self._alive_key = None
+        self._alive_line = ""
+        self._info_count = 0
+        self._info_text = ""
+        self._mention_pattern = None
+        self._mention_names = None
+        self._reset_day()
+
+    def _reset_day(self):
+        self._statements = [] # (speaker, statement) pairs of today's discussion seen so far
+        self._statement_lines = [] # Rendered, one per statement
+        self._compressed = 0 # Statements before this index live only in the rolling summary
+        self._mentions = Counter()
+
+    def _header_text(self):
+        if self._header is None:
+            self._header = (f"You are {self.player.name}, a {self.player.role}.\n"
+                            f"Your objective is to {self.player._objective()}.\n")
+        return self._header
+
+    def _alive_text(self, players):
+        alive_players = tuple(p.name for p in players if p.is_alive)
+        if alive_players != self._alive_key:
+            self._alive_key = alive_players
+            self._alive_line = f"Players currently alive: {', '.join(alive_players)}.\n"
+        return self._alive_line
+
+    def _known_info_text(self):
+        known_information = self.player.known_information
+        if len(known_information) < self._info_count: # List was replaced, start over
+            self._info_count = 0
+            self._info_text = ""
+        for info in known_information[self._info_count:]:
+            self._info_text += f"- {info}\n"
+        self._info_count = len(known_information)
+        return "Information you know:\n" + self._info_text if self._info_text else ""
+
+    def _sync_discussion(self, discussion):
+        seen = len(self._statements)
+        # The whole prefix, not just its last entry: a new day can repeat a statement at the
+        # same index (e.g. the "Error: Could not get a response." placeholder)
+        if discussion[:seen] != self._statements:
+            self._reset_day() # A new day's discussion
+            seen = 0
+        for speaker, statement in discussion[seen:]:
+            self._statements.append((speaker, statement))
+            self._statement_lines.append(f"- {speaker}: \"{statement}\"\n")
+
+    def _compress_until(self, index, players):
+        """Moves statements before `index` into the rolling summary (never moves back)."""
+        if index <= self._compressed:
+            return
+        names = tuple(p.name for p in players)
+        if names != self._mention_names:
+            self._mention_names = names
+            alternatives = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+            self._mention_pattern = re.compile(r"\b(" + alternatives + r")\b") if names else None
+        for speaker, statement in self._statements[self._compressed:index]:
+            if self._mention_pattern is not None:
+                self._mentions.update(set(self._mention_pattern.findall(statement)))
+        self._compressed = index
+
+    def _rolling_summary(self):
+        if not self._compressed:
+            return ""
+        text = f"- (Earlier, {self._compressed} statement(s) were made"
+        if self._mentions:
+            top = ", ".join(f"{name} ({count}x)" for name, count in self._mentions.most_common(SUMMARY_TOP_MENTIONS))
+            text += f"; most mentioned: {top}"
+        return text + ".)\n"
+
+    def build(self, players, daytime_discussion=None):
+        summary = self._header_text() + self._alive_text(players) + self._known_info_text()
+        if not daytime_discussion:
+            return summary
+
+        self._sync_discussion(daytime_discussion)
+        total = len(self._statement_lines)
+
+        # Newest statements first: keep as many verbatim as the window and budget allow
+        keep_from = self._compressed
+        if self.discussion_window is not None:
+            keep_from = max(keep_from, total - self.discussion_window)
+        if self.max_tokens is not None:
+            section_header = "\nPrevious statements from today's discussion:\n"
+            # Reserve room for the rolling summary, whose size is bounded
+            budget = (self.max_tokens - estimate_tokens(summary + section_header)
+                      - estimate_tokens(self._rolling_summary() or "x" * 160))
+            start = total
+            while start > keep_from:
+                cost = estimate_tokens(self._statement_lines[start - 1])
+                if cost > budget:
+                    break
+                budget -= cost
+                start -= 1
+            keep_from = start
+        self._compress_until(keep_from, players)
+
+        summary += "\nPrevious statements from today's discussion:\n"
+        summary += self._rolling_summary()
+        summary += "".join(self._statement_lines[self._compressed:])
+        return summary
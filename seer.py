@@ -1,15 +1,20 @@
 # seer.py
+import heuristics
 from player_base import Player
 from llm_interface import LLMInterface
+from metrics import tagged
 
 class Seer(Player):
+    __slots__ = ()
+    night_order = 1
+
     def __init__(self, name: str, llm_interface: LLMInterface):
         super().__init__(name, llm_interface)
 
     def night_action(self, players, game_log_callback):
-        """Seer chooses a player to investigate."""
+        """Seer chooses a player to investigate. Returns the investigated player, if any."""
         game_log_callback(f"\nIt's {self.name}'s (Seer) turn to investigate.")
-        game_state = self.get_game_state_summary(players)
+        game_state = self.get_prompt_context(players)
 
         # Seer can investigate anyone alive, including themselves (though usually not optimal)
         # Cannot investigate dead players.
@@ -17,7 +22,7 @@ class Seer(Player):
         
         if not investigate_options:
             game_log_callback(f"{self.name} (Seer) has no one to investigate.")
-            return # Nothing to do
+            return None # Nothing to do
 
         prompt = (
             f"{game_state}\n"
@@ -25,7 +30,11 @@ class Seer(Player):
             "Your goal is to find the Werewolves."
         )
         
-        chosen_player_name = self.llm_interface.get_player_choice(prompt, investigate_options)
+        fallback = lambda: heuristics.seer_target(investigate_options, self.known_information, self.name,
+                                                  self.llm_interface.fallback_rng())
+        with tagged(call_type="seer_investigation", player=self.name, role=self.role):
+            chosen_player_name = self.llm_interface.get_player_choice(prompt, investigate_options,
+                                                                      session=self.chat_session, fallback=fallback)
         
         target_player = None
         for p in players:
@@ -41,4 +50,5 @@ class Seer(Player):
             game_log_callback(f"{self.name} (Seer) investigated {target_player.name}. {vision_result} (Seer privately sees this)")
             self.add_known_info(f"{target_player.name} {is_wolf}.") # Add to Seer's private knowledge
         else:
-            game_log_callback(f"{self.name} (Seer) failed to choose a valid player for investigation.")
\ No newline at end of file
+            game_log_callback(f"{self.name} (Seer) failed to choose a valid player for investigation.")
+        return target_player
\ No newline at end of file
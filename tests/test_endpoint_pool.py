@@ -0,0 +1,84 @@
+# test_endpoint_pool.py
+import socket
+import time
+
+import pytest
+
+from endpoint_pool import DeadlineExceeded, EndpointPool
+from fake_ollama_server import FakeOllamaServer
+
+MESSAGES = [{"role": "user", "content": "Who do you suspect?"}]
+
+
+@pytest.fixture
+def servers():
+    """Starts FakeOllamaServers on demand and stops them all afterwards."""
+    started = []
+    def start(**kwargs):
+        server = FakeOllamaServer(seed=1, **kwargs).start()
+        started.append(server)
+        return server
+    yield start
+    for server in started:
+        server.stop()
+
+
+def make_pool(hosts, **kwargs):
+    return EndpointPool(hosts, client="http", **kwargs)
+
+
+def test_dead_endpoint_is_marked_unhealthy_and_recovers(servers):
+    live = servers()
+    with socket.socket() as sock: # A free port nothing listens on
+        sock.bind(("127.0.0.1", 0))
+        dead_port = sock.getsockname()[1]
+    dead_url = f"http://127.0.0.1:{dead_port}"
+
+    pool = make_pool([dead_url, live.url])
+    for _ in range(4): # Round-robin tie-breaking tries the dead endpoint first
+        assert pool.chat("llama3", MESSAGES)["message"]["content"]
+    dead_stats, live_stats = pool.stats()["endpoints"]
+    assert not dead_stats["healthy"]
+    assert dead_stats["failures"] == 1 # Not retried once marked unhealthy
+    assert live_stats["healthy"]
+
+    servers(port=dead_port) # The server comes back
+    assert pool.health_check() == {dead_url: True, live.url: True}
+    pool.close()
+
+
+def test_hedged_request_is_won_by_the_fast_endpoint(servers):
+    slow = servers(latency=1.0)
+    fast = servers(latency=0.0)
+    pool = make_pool([slow.url, fast.url], hedge=True, hedge_delay=0.05)
+    for _ in range(3):
+        started = time.perf_counter()
+        pool.chat("llama3", MESSAGES)
+        assert time.perf_counter() - started < 0.5
+    stats = pool.stats()
+    assert stats["hedged_requests"] >= 1
+    assert stats["hedge_wins"] == stats["hedged_requests"]
+    pool.close()
+
+
+def test_deadline_raises_and_keeps_the_endpoint_healthy(servers):
+    slow = servers(latency=1.0)
+    pool = make_pool([slow.url], deadline=0.2)
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        pool.chat("llama3", MESSAGES)
+    assert time.perf_counter() - started < 0.8
+    while pool.stats()["endpoints"][0]["outstanding"]: # Let the abandoned request time out too
+        time.sleep(0.01)
+    assert pool.stats()["endpoints"][0]["healthy"] # Slow is not the same as down
+    pool.close()
+
+
+def test_each_streamed_chat_is_sent_once(servers):
+    server = servers()
+    pool = make_pool([server.url])
+    for _ in range(5):
+        chunks = list(pool.chat("llama3", MESSAGES, stream=True))
+        assert chunks[-1]["done"]
+    assert server.requests_served == 5
+    pool.close()
@@ -0,0 +1,61 @@
+# test_model_scheduler.py
+import threading
+import time
+
+from model_scheduler import ModelAffinityScheduler
+
+
+def test_max_drain_hands_over_to_the_waiting_model():
+    scheduler = ModelAffinityScheduler(max_in_flight=1, max_drain=4)
+    order = []
+    gate = threading.Event()
+    def job(model, wait=False):
+        def run():
+            if wait:
+                gate.wait()
+            order.append(model)
+        return run
+
+    # The first job holds the only slot until every other job is queued
+    futures = [scheduler.submit("a", job("a", wait=True))]
+    futures += [scheduler.submit("a", job("a")) for _ in range(19)]
+    futures += [scheduler.submit("b", job("b")) for _ in range(3)]
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    scheduler.shutdown()
+
+    assert "".join(order) == "aaaa" + "bbb" + "a" * 16
+    assert scheduler.switches == 2
+
+
+def test_switch_waits_for_in_flight_requests():
+    scheduler = ModelAffinityScheduler(max_in_flight=4)
+    timeline = []
+    lock = threading.Lock()
+    started = threading.Semaphore(0)
+    release = threading.Event()
+    def job(model, wait=False):
+        def run():
+            with lock:
+                timeline.append(("start", model))
+            if wait:
+                started.release()
+                release.wait()
+            with lock:
+                timeline.append(("end", model))
+        return run
+
+    a_jobs = [scheduler.submit("a", job("a", wait=True)) for _ in range(2)]
+    for _ in a_jobs:
+        assert started.acquire(timeout=5) # Both "a" requests are running
+    b_job = scheduler.submit("b", job("b"))
+    time.sleep(0.1) # Gives the dispatcher time to (wrongly) start it
+    assert not b_job.done() and ("start", "b") not in timeline # Free slots, but a switch must wait
+    release.set()
+    for future in a_jobs + [b_job]:
+        future.result(timeout=5)
+    scheduler.shutdown()
+
+    assert timeline.index(("start", "b")) > max(i for i, event in enumerate(timeline) if event == ("end", "a"))
+    assert scheduler.switches == 1
@@ -1,18 +1,22 @@
 # werewolf_player.py
+import heuristics
 from player_base import Player
 from llm_interface import LLMInterface
+from metrics import tagged
 
 class Werewolf(Player):
+    __slots__ = ()
+    night_order = 0
+
     def __init__(self, name: str, llm_interface: LLMInterface):
         super().__init__(name, llm_interface)
-        # Werewolves might know other werewolves if we extend the game
-        # For now, assumes one werewolf, so no special initial knowledge.
+        # Fellow werewolves are revealed through known_information at the start of the game.
 
     def night_action(self, players, game_log_callback):
-        """Werewolf chooses a player to kill."""
+        """Werewolf chooses a player to kill. The kill itself is applied by the game at dawn."""
         game_log_callback(f"\nIt's {self.name}'s (Werewolf) turn to choose a victim.")
         
-        game_state = self.get_game_state_summary(players)
+        game_state = self.get_prompt_context(players)
         
         # Werewolves cannot kill themselves, or other werewolves (if multiple)
         # For now, just can't kill self. Can't kill already dead players.
@@ -28,7 +32,11 @@ class Werewolf(Player):
             "Your goal is to reduce the number of villagers."
         )
         
-        victim_name = self.llm_interface.get_player_choice(prompt, target_options)
+        fallback = lambda: heuristics.werewolf_target(target_options, self.last_discussion,
+                                                      self.llm_interface.fallback_rng())
+        with tagged(call_type="night_kill", player=self.name, role=self.role):
+            victim_name = self.llm_interface.get_player_choice(prompt, target_options, session=self.chat_session,
+                                                               fallback=fallback)
         game_log_callback(f"{self.name} (Werewolf) has chosen to attack {victim_name}.")
         
         # Find the player object